@@ -7,6 +7,7 @@ from pydantic import BaseModel
 from dotenv import load_dotenv
 from openai import AsyncOpenAI
 from pathlib import Path
+import asyncio
 import httpx
 import sys
 import os
@@ -25,7 +26,7 @@ from pydantic_ai.messages import (
     TextPart
 )
 
-from parts_select_ai_expert import parts_select_expert, PartsSelectAIDeps
+from parts_select_ai_expert import parts_select_expert, PartsSelectAIDeps, crawl_cache, crawl_flight, crawl_executor, catalog_store, embedder_registry, query_embedding_cache, faiss_troubleshoot, part_knowledge
 
 # Load environment variables
 load_dotenv()
@@ -232,6 +233,27 @@ async def test_supabase_connection(authenticated: bool = Depends(verify_token)):
         logger.error(f"Supabase connection test failed: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Supabase connection test failed: {str(e)}")
 
+@app.get("/api/crawler-stats")
+async def get_crawler_stats(authenticated: bool = Depends(verify_token)):
+    """Report catalog, crawl cache, single-flight and crawl executor counters for the crawler-backed tools."""
+    return {
+        "cache": crawl_cache.stats,
+        "single_flight": {**crawl_flight.stats, "in_flight": crawl_flight.in_flight()},
+        "executor": {**crawl_executor.stats, "queue_depth": crawl_executor.queue_depth()},
+        # Counting the catalog tables reads the SQLite file, kept off the event loop
+        "catalog": await asyncio.to_thread(catalog_store.counts),
+    }
+
+@app.get("/api/knowledge-base-stats")
+async def get_knowledge_base_stats(authenticated: bool = Depends(verify_token)):
+    """Report shared embedding model memory, query embedding cache counters and lexical/model query split for the troubleshooting and part knowledge searches."""
+    return {
+        "embedders": embedder_registry.memory_report(),
+        "query_embeddings": query_embedding_cache.summary(),
+        "troubleshoot_search": faiss_troubleshoot.search_summary(),
+        "part_knowledge_search": part_knowledge.search_summary() if part_knowledge is not None else None,
+    }
+
 
 class WelcomeMessageRequest(BaseModel):
     session_id: str
@@ -0,0 +1,142 @@
+"""
+Compare the index types FaissIndexer can build (knowledge_base/AnnIndex.py) on synthetic corpora shaped like
+sentence embeddings (unit vectors around topic centers): build time, index size, recall@k against the exact flat
+index and single-query latency at several ef_search / nprobe settings.
+
+Run from the backend directory:
+    python -m benchmarks.ann_benchmark [--sizes 10000 100000 1000000] [--k 10] [--queries 200] [--output results.json]
+"""
+import statistics
+import tempfile
+import argparse
+import json
+import time
+import os
+
+import faiss
+import numpy as np
+
+from knowledge_base.AnnIndex import build_index, index_params, training_size
+
+DIMENSION = 384
+LATENT_DIMENSION = 32
+
+# Search-time settings tried per index type
+KNOBS = {
+    "flat": [None],
+    "hnsw": [16, 64, 256],
+    "ivf_flat": [1, 8, 32],
+    "ivf_pq": [1, 8, 32],
+}
+
+
+def synthetic_corpus(size, queries, seed=0):
+    """
+    size unit vectors around size / 100 random topic centers, and queries near random corpus vectors.
+    Like sentence embeddings, the vectors vary along far fewer directions than they have dimensions:
+    they are drawn in a LATENT_DIMENSION space, projected to DIMENSION and slightly perturbed.
+    """
+    rng = np.random.default_rng(seed)
+    projection = rng.standard_normal((LATENT_DIMENSION, DIMENSION)).astype("float32")
+    centers = rng.standard_normal((max(1, size // 100), LATENT_DIMENSION)).astype("float32")
+
+    def embed(latent):
+        vectors = latent @ projection
+        vectors += 0.1 * np.linalg.norm(vectors, axis=1, keepdims=True) / np.sqrt(DIMENSION) * rng.standard_normal(vectors.shape).astype("float32")
+        faiss.normalize_L2(vectors)
+        return vectors
+
+    latent = centers[rng.integers(0, len(centers), size)] + 0.5 * rng.standard_normal((size, LATENT_DIMENSION)).astype("float32")
+    query_latent = latent[rng.integers(0, size, queries)] + 0.2 * rng.standard_normal((queries, LATENT_DIMENSION)).astype("float32")
+    return embed(latent), embed(query_latent)
+
+
+def index_bytes(index):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "index.bin")
+        faiss.write_index(index, path)
+        return os.path.getsize(path)
+
+
+def build(index_type, vectors):
+    start = time.perf_counter()
+    index = build_index(DIMENSION, index_type, index_params(index_type, size=len(vectors)))
+    if not index.is_trained:
+        sample = vectors[np.random.default_rng(1).permutation(len(vectors))[:training_size(index)]]
+        index.train(sample)
+    index.add_with_ids(vectors, np.arange(len(vectors), dtype="int64"))
+    return index, time.perf_counter() - start
+
+
+def search_parameters(index_type, knob):
+    if index_type == "hnsw":
+        return faiss.SearchParametersHNSW(efSearch=knob)
+    if index_type in ("ivf_flat", "ivf_pq"):
+        return faiss.SearchParametersIVF(nprobe=knob)
+    return None
+
+
+def measure(index, query_vectors, k, params, truth):
+    latencies = []
+    found = []
+    for query in query_vectors:
+        start = time.perf_counter()
+        _, ids = index.search(query[None, :], k, params=params)
+        latencies.append(time.perf_counter() - start)
+        found.append(ids[0])
+    recall = np.mean([len(set(ids) & set(expected)) / k for ids, expected in zip(found, truth)])
+    latencies.sort()
+    return {
+        "recall": round(float(recall), 4),
+        "p50_ms": round(1000 * statistics.median(latencies), 3),
+        "p99_ms": round(1000 * latencies[min(len(latencies) - 1, int(0.99 * len(latencies)))], 3),
+    }
+
+
+def run(sizes, k, queries, threads):
+    if threads:
+        faiss.omp_set_num_threads(threads)
+    results = []
+    for size in sizes:
+        vectors, query_vectors = synthetic_corpus(size, queries)
+        # Exact neighbours from the flat index are the reference for recall
+        flat, _ = build("flat", vectors)
+        _, truth = flat.search(query_vectors, k)
+        del flat
+
+        print(f"\n{size} vectors, recall@{k} over {queries} queries")
+        print(f"{'index':<10}{'knob':>6}{'build s':>9}{'size MB':>9}{f'recall@{k}':>11}{'p50 ms':>9}{'p99 ms':>9}")
+        for index_type, knobs in KNOBS.items():
+            index, build_seconds = build(index_type, vectors)
+            size_mb = index_bytes(index) / 2**20
+            for knob in knobs:
+                result = {
+                    "size": size,
+                    "index": index_type,
+                    "knob": knob,
+                    "build_seconds": round(build_seconds, 2),
+                    "size_mb": round(size_mb, 1),
+                    **measure(index, query_vectors, k, search_parameters(index_type, knob), truth),
+                }
+                results.append(result)
+                print(
+                    f"{index_type:<10}{knob if knob is not None else '-':>6}{result['build_seconds']:>9}{result['size_mb']:>9}"
+                    f"{result['recall']:>11}{result['p50_ms']:>9}{result['p99_ms']:>9}"
+                )
+            del index
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the FAISS index types on synthetic embedding corpora.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--threads", type=int, default=0, help="FAISS threads, 0 keeps the default")
+    parser.add_argument("--output", help="Also write the results to this JSON file")
+    args = parser.parse_args()
+
+    results = run(args.sizes, args.k, args.queries, args.threads)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
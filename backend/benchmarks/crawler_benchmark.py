@@ -0,0 +1,206 @@
+"""
+Run every crawler against the replayed fixture pages (benchmarks/replay_server.py) and report, per crawler,
+wall time, time spent fetching pages, time spent parsing them, browser startup time and peak memory: the resident
+memory of the benchmark process and its children (chromedriver and Chrome), which includes lxml's and httpx's
+native allocations, and the Python heap peak.
+Results are only comparable between runs on the same machine, and as the fixture pages are synthetic
+they compare crawler versions with each other rather than measure partselect.com.
+
+Run from the backend directory:
+    python -m benchmarks.crawler_benchmark [--repeat 5] [--latency 0.05] [--fetcher auto] [--output results.json]
+"""
+import statistics
+import tracemalloc
+import threading
+import argparse
+import json
+import time
+import os
+
+from benchmarks.replay_server import start_replay_server
+
+PART_PATH = "/PS11752778-Whirlpool-WPW10321304-Refrigerator-Door-Shelf-Bin.htm"
+MODEL_NUMBER = "WDT780SAEM1"
+PART_NUMBER = "PS11752778"
+
+
+def crawlers(base_url):
+    """
+    Crawler name -> (whether it always drives Chrome, function running it once).
+    Imported here because the crawler modules read PARTSELECT_BASE_URL on import.
+    """
+    from crawler.PartInformation import PartInformation
+    from crawler.ModelInformation import ModelInformation
+    from crawler.ModelCompatibility import checkModalCompatibility
+    from knowledge_base.TroubleshootInformation import TroubleshootInformation
+
+    search_url = f"{base_url}/api/search/?searchterm={PART_NUMBER}&SearchMethod=standard"
+    return {
+        "PartInformation": (False, lambda: PartInformation(f"{base_url}{PART_PATH}").getPartInfoModel()),
+        "PartInformation (search)": (False, lambda: PartInformation(search_url).getPartInfoModel()),
+        "ModelInformation": (False, lambda: ModelInformation(f"{base_url}/Models/{MODEL_NUMBER}/").getmodelInfoModel()),
+        "checkModalCompatibility": (False, lambda: checkModalCompatibility(MODEL_NUMBER, PART_NUMBER)),
+        "TroubleshootInformation": (True, lambda: TroubleshootInformation(f"{base_url}/Repair/Dishwasher", parallel=False).symptom_data),
+        "TroubleshootInformation (parallel)": (False, lambda: TroubleshootInformation(f"{base_url}/Repair/Dishwasher", parallel=True).symptom_data),
+    }
+
+
+def counters():
+    """
+    Cumulative fetch, parse and browser startup seconds recorded by the crawler stack so far.
+    """
+    from crawler.Fetcher import get_fetcher
+    from crawler.HtmlParser import parse_stats
+    from crawler import DriverPool
+
+    return {
+        "fetch": get_fetcher().stats["fetch_seconds"],
+        "parse": sum(stats["parse_seconds"] for stats in parse_stats.summary().values()),
+        "browser_startup": DriverPool._pool.stats["startup_seconds"] if DriverPool._pool else 0.0,
+    }
+
+
+def start_browser():
+    """
+    Create the driver pool and return how long that took. chromedriver is resolved with the first driver,
+    so that time is part of the browser_startup the pool records.
+    """
+    from crawler.DriverPool import get_driver_pool
+
+    start = time.perf_counter()
+    get_driver_pool()
+    return time.perf_counter() - start
+
+
+def run_once(run, uses_browser):
+    before = counters()
+    start = time.perf_counter()
+    pool_startup = start_browser() if uses_browser else 0.0
+    result = run()
+    wall = time.perf_counter() - start
+    after = counters()
+    timing = {key: after[key] - before[key] for key in before}
+    timing["browser_startup"] += pool_startup
+    if uses_browser:
+        # Pages are loaded and read inside the crawler, everything but parsing and startup is the fetch
+        timing["fetch"] = wall - timing["parse"] - timing["browser_startup"]
+    timing["wall"] = wall
+    return result, timing
+
+
+def tree_resident_bytes(pid=None):
+    """
+    Resident set size of a process (this one by default) and all its descendants, summed, so that pages shared
+    between processes count once per process (Linux only, None elsewhere).
+    """
+    pid = pid or os.getpid()
+    try:
+        children = {}
+        for entry in os.listdir("/proc"):
+            if not entry.isdigit():
+                continue
+            try:
+                with open(f"/proc/{entry}/stat") as f:
+                    # The parent pid follows the state, after the parenthesized command name
+                    parent = int(f.read().rsplit(")", 1)[1].split()[1])
+            except (OSError, ValueError, IndexError):
+                continue
+            children.setdefault(parent, []).append(int(entry))
+        total = 0
+        pending = [pid]
+        while pending:
+            current = pending.pop()
+            pending.extend(children.get(current, []))
+            try:
+                with open(f"/proc/{current}/statm") as f:
+                    total += int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+            except (OSError, ValueError):
+                # The process exited meanwhile
+                continue
+        return total
+    except (OSError, ValueError):
+        return None
+
+
+def peak_memory(run, interval=0.02):
+    """
+    Run once and return the peak resident memory of this process and its children, sampled every interval seconds
+    from a background thread (None without /proc), and the peak Python heap, both in bytes.
+    """
+    peak = {"rss": tree_resident_bytes()}
+    done = threading.Event()
+
+    def sample():
+        while not done.wait(interval):
+            rss = tree_resident_bytes()
+            if rss is not None:
+                peak["rss"] = max(peak["rss"] or 0, rss)
+
+    sampler = threading.Thread(target=sample, name="memory-sampler", daemon=True)
+    sampler.start()
+    tracemalloc.start()
+    try:
+        run()
+        heap = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+        done.set()
+        sampler.join()
+    return peak["rss"], heap
+
+
+def benchmark(base_url, repeat):
+    results = {}
+    for name, (uses_browser, run) in crawlers(base_url).items():
+        try:
+            runs = []
+            for _ in range(repeat):
+                result, timing = run_once(run, uses_browser)
+                if result is None:
+                    raise RuntimeError("crawler returned no data")
+                runs.append(timing)
+            results[name] = {key: statistics.median(timing[key] for timing in runs) for key in runs[0]}
+            # The first run includes the one-off browser startup, the median would hide it
+            results[name]["browser_startup"] = max(timing["browser_startup"] for timing in runs)
+            rss, heap = peak_memory(run)
+            results[name]["peak_rss_mb"] = rss / 2**20 if rss is not None else None
+            results[name]["peak_heap_mb"] = heap / 2**20
+        except Exception as e:
+            results[name] = {"error": str(e)}
+    return results
+
+
+def print_results(results, repeat):
+    print(f"\nMedian of {repeat} runs (browser startup: slowest run). Fetch time is summed over concurrent fetches,")
+    print("peak RSS is summed over this process, chromedriver and Chrome, heap is the Python heap peak")
+    print(f"{'crawler':<36}{'wall ms':>10}{'fetch ms':>10}{'parse ms':>10}{'browser ms':>12}{'RSS MB':>10}{'heap MB':>10}")
+    for name, result in results.items():
+        if "error" in result:
+            print(f"{name:<36}  failed: {result['error']}")
+            continue
+        rss = f"{result['peak_rss_mb']:.1f}" if result["peak_rss_mb"] is not None else "n/a"
+        print(
+            f"{name:<36}{result['wall'] * 1000:>10.1f}{result['fetch'] * 1000:>10.1f}{result['parse'] * 1000:>10.1f}"
+            f"{result['browser_startup'] * 1000:>12.1f}{rss:>10}{result['peak_heap_mb']:>10.1f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the crawlers against the replayed synthetic fixture pages.")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds the replay server adds to every response")
+    parser.add_argument("--fetcher", default=None, help="CRAWLER_FETCHER mode: auto, http or selenium")
+    parser.add_argument("--output", help="Also write the results to this JSON file")
+    args = parser.parse_args()
+
+    server, base_url = start_replay_server(latency=args.latency)
+    os.environ["PARTSELECT_BASE_URL"] = base_url
+    if args.fetcher:
+        os.environ["CRAWLER_FETCHER"] = args.fetcher
+
+    results = benchmark(base_url, args.repeat)
+    print_results(results, args.repeat)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"base_url": base_url, "latency": args.latency, "repeat": args.repeat, "results": results}, f, indent=2)
+    server.shutdown()
@@ -0,0 +1,128 @@
+"""
+Compare the embedder backends (knowledge_base/EmbedderRegistry.py) on single-query encoding, the way the
+troubleshooting tool encodes: p50/p99 latency, resident memory added by loading the model, and how close the
+vectors are to the ones stored in the troubleshooting index. Each backend runs in its own process so that
+memory is not shared between them.
+
+Run from the backend directory:
+    python -m benchmarks.embedder_benchmark [--backends torch onnx] [--queries 200] [--threads 1] [--output results.json]
+"""
+import statistics
+import subprocess
+import argparse
+import json
+import time
+import sys
+import os
+
+INDEX_PATH = "./knowledge_base/troubleshoot_faiss_index.bin"
+METADATA_PATH = "./knowledge_base/troubleshoot_metadata.meta"
+
+QUESTIONS = [
+    "my dishwasher is making a grinding noise",
+    "water is pooling under the fridge",
+    "dishes come out dirty and still wet",
+    "the ice maker stopped making ice after we moved",
+    "freezer is cold but the fridge is warm",
+    "dishwasher won't start when I press the button",
+    "the light inside my refrigerator stays off",
+    "water dispenser is not working",
+]
+
+
+def resident_bytes():
+    """
+    Resident set size of this process (Linux only, None elsewhere).
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return None
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q * (len(values) - 1))))]
+
+
+def run_backend(backend, queries, threads):
+    """
+    Load the index and the backend's model in this process, then encode queries one at a time.
+    """
+    from knowledge_base.EmbedderRegistry import get_embedder_registry
+    from knowledge_base.FaissIndexer import FaissIndexer
+
+    registry = get_embedder_registry()
+    registry.threads = threads
+    registry.use_backend(backend)
+    indexer = FaissIndexer(data_list=None)
+    indexer.load_index(INDEX_PATH, METADATA_PATH)
+    texts = [symptom["title"] for symptom in indexer.symptoms] + QUESTIONS
+
+    rss_before = resident_bytes()
+    start = time.perf_counter()
+    model = indexer.model
+    load_seconds = time.perf_counter() - start
+    rss_loaded = resident_bytes()
+
+    # Warm up kernels and allocator before timing
+    for text in texts[:5]:
+        model.encode(text)
+    latencies = []
+    for i in range(queries):
+        start = time.perf_counter()
+        model.encode(texts[i % len(texts)])
+        latencies.append(time.perf_counter() - start)
+    rss_after = resident_bytes()
+
+    return {
+        "backend": backend,
+        "threads": threads,
+        "load_seconds": round(load_seconds, 2),
+        "p50_ms": round(1000 * statistics.median(latencies), 2),
+        "p99_ms": round(1000 * percentile(latencies, 0.99), 2),
+        "model_rss_mb": round((rss_loaded - rss_before) / 2**20, 1) if rss_before is not None else None,
+        "rss_after_mb": round(rss_after / 2**20, 1) if rss_after is not None else None,
+        "compatibility": indexer.embedder_compatibility(),
+    }
+
+
+def run(backends, queries, threads):
+    results = []
+    for backend in backends:
+        # A fresh interpreter per backend, so torch is not already loaded when measuring onnx and vice versa
+        command = [sys.executable, "-m", "benchmarks.embedder_benchmark", "--worker", backend, "--queries", str(queries), "--threads", str(threads)]
+        completed = subprocess.run(command, capture_output=True, text=True)
+        lines = completed.stdout.strip().splitlines()
+        if completed.returncode != 0 or not lines:
+            print(f"Error benchmarking {backend}: {completed.stderr.strip().splitlines()[-1:] or completed.returncode}")
+            continue
+        results.append(json.loads(lines[-1]))
+
+    print(f"\n{'backend':<10}{'load s':>8}{'p50 ms':>9}{'p99 ms':>9}{'model MB':>10}{'RSS MB':>9}{'min cos':>9}{'mean cos':>10}")
+    for result in results:
+        compatibility = result["compatibility"]
+        print(
+            f"{result['backend']:<10}{result['load_seconds']:>8}{result['p50_ms']:>9}{result['p99_ms']:>9}"
+            f"{result['model_rss_mb']!s:>10}{result['rss_after_mb']!s:>9}{compatibility['min_cosine']:>9}{compatibility['mean_cosine']:>10}"
+        )
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the embedder backends on single-query encoding.")
+    parser.add_argument("--backends", nargs="+", default=["torch", "onnx"])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--threads", type=int, default=1, help="CPU threads per encode, 0 for the runtime default")
+    parser.add_argument("--output", help="Also write the results to this JSON file")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_backend(args.worker, args.queries, args.threads)))
+    else:
+        results = run(args.backends, args.queries, args.threads)
+        if args.output:
+            with open(args.output, "w") as f:
+                json.dump(results, f, indent=2)
@@ -0,0 +1,117 @@
+"""
+Measure what the normalized knowledge base metadata saves over the original layout, where every solution entry
+carries its whole parent symptom: file size, memory after loading and the size of the data each search hit returns.
+
+Run from the backend directory:
+    python -m benchmarks.kb_metadata_benchmark
+"""
+import tracemalloc
+import tempfile
+import pickle
+import json
+import os
+
+from knowledge_base.FaissIndexer import FaissIndexer
+from knowledge_base.MetadataFile import MetadataFile, write_metadata
+
+INDEX_PATH = "./knowledge_base/troubleshoot_faiss_index.bin"
+METADATA_PATH = "./knowledge_base/troubleshoot_metadata.meta"
+
+
+def resident_bytes():
+    """
+    Resident set size of this process (Linux only, None elsewhere).
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return None
+
+
+def original_layout(indexer):
+    """
+    The metadata as the original create_index built it: the full symptom, shared, as every solution's parent.
+    """
+    symptoms = list(indexer.symptoms)
+    metadata = []
+    for record in indexer.metadata:
+        # Ids whose vector was removed by an incremental update
+        if record is None:
+            metadata.append(None)
+            continue
+        symptom = symptoms[record["symptom"]]
+        if record["type"] == "title":
+            metadata.append({"type": "title", "appliance": record["appliance"], "data": symptom})
+        else:
+            metadata.append({
+                "type": "solution",
+                "appliance": record["appliance"],
+                "parent": symptom,
+                "data": symptom["solutions"][record["solution"]],
+            })
+    return metadata
+
+
+def measure_load(load):
+    """
+    Load the metadata, touch every entry the way searches would, and report heap and resident memory growth.
+    """
+    rss_before = resident_bytes()
+    tracemalloc.start()
+    metadata, resolve = load()
+    loaded = tracemalloc.get_traced_memory()[0]
+    hit_bytes = [len(json.dumps(resolve(metadata, idx))) for idx in range(len(metadata))]
+    tracemalloc.stop()
+    rss_after = resident_bytes()
+    return {
+        "heap_after_load": loaded,
+        "rss_growth": rss_after - rss_before if rss_before is not None else None,
+        "avg_hit_bytes": sum(hit_bytes) / len(hit_bytes),
+        "max_hit_bytes": max(hit_bytes),
+    }
+
+
+def run():
+    indexer = FaissIndexer(data_list=None)
+    indexer.load_index(INDEX_PATH, METADATA_PATH)
+    original = original_layout(indexer)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pickle_path = os.path.join(tmp, "metadata.pkl")
+        with open(pickle_path, "wb") as f:
+            pickle.dump(original, f)
+        # The original entries written to an offset-indexed file, where nothing is shared between records
+        denormalized_path = os.path.join(tmp, "denormalized.meta")
+        write_metadata(denormalized_path, original)
+
+        def load_pickle():
+            with open(pickle_path, "rb") as f:
+                return pickle.load(f), lambda metadata, idx: metadata[idx]
+
+        def load_denormalized():
+            return MetadataFile(denormalized_path), lambda metadata, idx: metadata[idx]
+
+        def load_normalized():
+            normalized = FaissIndexer(data_list=None)
+            normalized.load_index(INDEX_PATH, METADATA_PATH)
+            return normalized.metadata, lambda metadata, idx: metadata[idx] and normalized.resolve(metadata[idx])
+
+        layouts = {
+            "original (pickle)": (pickle_path, load_pickle),
+            "original (offset file)": (denormalized_path, load_denormalized),
+            "normalized (offset file)": (METADATA_PATH, load_normalized),
+        }
+        print(f"\n{len(original)} vectors, {len(indexer.symptoms)} symptoms")
+        print(f"{'layout':<28}{'file KB':>10}{'heap KB':>10}{'RSS KB':>10}{'avg hit B':>12}{'max hit B':>12}")
+        for name, (path, load) in layouts.items():
+            result = measure_load(load)
+            rss = f"{result['rss_growth'] / 1024:.0f}" if result["rss_growth"] is not None else "n/a"
+            print(
+                f"{name:<28}{os.path.getsize(path) / 1024:>10.0f}{result['heap_after_load'] / 1024:>10.0f}{rss:>10}"
+                f"{result['avg_hit_bytes']:>12.0f}{result['max_hit_bytes']:>12}"
+            )
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,71 @@
+"""
+Compare the original parsing (BeautifulSoup with html.parser over the whole page) against
+crawler.HtmlParser.parse_page on the pages in benchmarks/fixtures, checking that every
+extractor returns exactly the same data both ways. The fixtures are synthetic pages following PartSelect's
+markup (see benchmarks/replay_server.py), so the check covers the markup the extractors expect, not the
+live site's current pages.
+
+Run from the backend directory:
+    python -m benchmarks.parse_benchmark [--repeat 20]
+"""
+from bs4 import BeautifulSoup
+import argparse
+import time
+import os
+
+from crawler.HtmlParser import parse_page, HTML_PARSER
+from crawler.PartInformation import PartInformation
+from crawler.ModelInformation import ModelInformation
+from crawler.ModelParts import extractPartLinks
+from knowledge_base.TroubleshootInformation import TroubleshootInformation
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+FIXTURE_URL = "https://www.partselect.com/PS11752778-Whirlpool-WPW10321304-Refrigerator-Door-Shelf-Bin.htm"
+MODEL_URL = "https://www.partselect.com/Models/WDT780SAEM1/"
+
+# page type -> extractor run on the parsed page
+EXTRACTORS = {
+    "part": lambda soup: PartInformation.parsePartInfo(soup, FIXTURE_URL),
+    "repair_stories": PartInformation.parseUserStories,
+    "questions_and_answers": PartInformation.parseQuestionAndAnswers,
+    "model": lambda soup: (ModelInformation.parseModelInfo(soup, MODEL_URL), ModelInformation.parseVideos(soup)),
+    "model_videos": ModelInformation.parseVideos,
+    "model_parts": extractPartLinks,
+    "repair": TroubleshootInformation.parse_symptom_list,
+    "symptom": TroubleshootInformation.parse_symptom_page,
+}
+
+
+def time_parse(parse, html, extract, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = extract(parse(html))
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def run(repeat):
+    print(f"Parser: {HTML_PARSER}, best of {repeat} runs, parse + extract")
+    print(f"{'page type':<24}{'size':>10}{'baseline ms':>14}{'parse_page ms':>16}{'speedup':>10}  same output")
+    total_baseline = total_fast = 0.0
+    for page_type, extract in EXTRACTORS.items():
+        with open(os.path.join(FIXTURES_DIR, f"{page_type}.html"), encoding="utf-8") as f:
+            html = f.read()
+        baseline, expected = time_parse(lambda h: BeautifulSoup(h, "html.parser"), html, extract, repeat)
+        fast, actual = time_parse(lambda h: parse_page(h, page_type), html, extract, repeat)
+        total_baseline += baseline
+        total_fast += fast
+        print(
+            f"{page_type:<24}{len(html) / 1024:>8.0f}KB{baseline * 1000:>14.2f}{fast * 1000:>16.2f}"
+            f"{baseline / fast:>9.1f}x  {expected == actual}"
+        )
+        if expected != actual:
+            print(f"  baseline:   {expected}\n  parse_page: {actual}")
+    print(f"{'total':<34}{total_baseline * 1000:>14.2f}{total_fast * 1000:>16.2f}{total_baseline / total_fast:>9.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark crawler HTML parsing on the synthetic fixture pages.")
+    parser.add_argument("--repeat", type=int, default=20)
+    run(parser.parse_args().repeat)
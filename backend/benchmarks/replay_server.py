@@ -0,0 +1,110 @@
+"""
+Local HTTP server replaying the pages in benchmarks/fixtures, so the crawlers can be run and timed without
+hitting partselect.com. Point them at it with PARTSELECT_BASE_URL.
+The fixtures are synthetic: they follow the markup the crawlers read on PartSelect (same containers and classes)
+but their content is generated and they are not captured site pages. Timings taken against them compare crawler
+versions with each other, they are not measurements of the real site.
+
+Run from the backend directory:
+    python -m benchmarks.replay_server [--port 8765] [--latency 0.05]
+"""
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+import threading
+import argparse
+import time
+import re
+import os
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+
+# (path pattern, query handler or None, fixture) checked in order, the first match is served
+ROUTES = [
+    (r"^/PS\d+[^/]*\.htm$", "RepairStories", "repair_stories.html"),
+    (r"^/PS\d+[^/]*\.htm$", "QuestionsAndAnswers", "questions_and_answers.html"),
+    (r"^/PS\d+[^/]*\.htm$", None, "part.html"),
+    (r"^/Models/[^/]+/Parts/$", None, "model_parts.html"),
+    (r"^/Models/[^/]+/Videos/$", None, "model_videos.html"),
+    (r"^/Models/[^/]+/$", None, "model.html"),
+    (r"^/Repair/[^/]+/[^/]+/?$", None, "symptom.html"),
+    (r"^/Repair/[^/]+/?$", None, "repair.html"),
+]
+
+
+def load_fixtures():
+    fixtures = {}
+    for name in os.listdir(FIXTURES_DIR):
+        if name.endswith(".html"):
+            with open(os.path.join(FIXTURES_DIR, name), "rb") as f:
+                fixtures[name] = f.read()
+    return fixtures
+
+
+class ReplayHandler(BaseHTTPRequestHandler):
+    fixtures = {}
+    latency = 0.0
+
+    def do_GET(self):
+        self.serve(body=True)
+
+    def do_HEAD(self):
+        # Used by the crawlers to resolve the search redirect without downloading the part page
+        self.serve(body=False)
+
+    def serve(self, body):
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        if self.latency:
+            time.sleep(self.latency)
+
+        # The site search redirects a PS number straight to its part page
+        if url.path.startswith("/api/search/"):
+            match = re.search(r"PS(\d+)", query.get("searchterm", [""])[0], re.IGNORECASE)
+            if not match:
+                return self.send_error(404)
+            self.send_response(302)
+            self.send_header("Location", f"/PS{match.group(1)}-Replay-Part.htm?SourceCode=3")
+            self.end_headers()
+            return
+
+        handler = query.get("handler", [None])[0]
+        for pattern, route_handler, fixture in ROUTES:
+            if re.match(pattern, url.path) and route_handler in (None, handler):
+                page = self.fixtures[fixture]
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(page)))
+                self.end_headers()
+                if body:
+                    self.wfile.write(page)
+                return
+        self.send_error(404)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_replay_server(port=0, latency=0.0):
+    """
+    Serve the fixtures on 127.0.0.1:port (a free port when 0) from a background thread.
+    latency adds a fixed delay to every response to imitate the network.
+    Returns the server and its base URL, stop it with server.shutdown().
+    """
+    handler = type("Handler", (ReplayHandler,), {"fixtures": load_fixtures(), "latency": latency})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="replay-server", daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay the synthetic PartSelect fixture pages over HTTP.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every response")
+    args = parser.parse_args()
+    server, base_url = start_replay_server(args.port, args.latency)
+    print(f"Replaying {FIXTURES_DIR} on {base_url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
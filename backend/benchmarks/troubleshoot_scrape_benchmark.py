@@ -0,0 +1,102 @@
+"""
+Time a full troubleshooting scrape (every appliance's Repair page and all its symptom pages, see
+knowledge_base/ScrapeAndIndexTroubleshoot.py) against the replayed synthetic fixture pages (benchmarks/replay_server.py):
+the serial path, one page after another in one Chrome driver, against the parallel one, appliances and symptom
+pages fetched concurrently through the shared page fetcher. Both must return the same symptoms in the same order.
+For the parallel scrape the page fetcher's HTTP fetches, Selenium renders and auto-mode Selenium fallbacks per scrape
+are reported next to the timing, as a fast run is only meaningful when pages were not rendered in Chrome.
+
+Run from the backend directory:
+    python -m benchmarks.troubleshoot_scrape_benchmark [--repeat 3] [--latency 0.2] [--fetcher auto] [--modes serial parallel] [--output results.json]
+"""
+import statistics
+import argparse
+import json
+import time
+import os
+
+from benchmarks.replay_server import start_replay_server
+
+
+FETCH_COUNTS = ("http", "selenium", "fallbacks")
+
+
+def scrape(parallel):
+    """
+    One full scrape: its data, errors, wall time and how many pages the shared page fetcher got over HTTP,
+    rendered in Selenium and fell back to Selenium for (all 0 for the serial scrape, which drives Chrome itself).
+    """
+    # Imported here because the crawler modules read PARTSELECT_BASE_URL on import
+    from knowledge_base.ScrapeAndIndexTroubleshoot import scrape_troubleshoot
+    from crawler.Fetcher import get_fetcher
+
+    stats = get_fetcher().stats
+    before = {key: stats[key] for key in FETCH_COUNTS}
+    start = time.perf_counter()
+    data, errors = scrape_troubleshoot(parallel=parallel)
+    wall = time.perf_counter() - start
+    return data, errors, wall, {key: stats[key] - before[key] for key in FETCH_COUNTS}
+
+
+def benchmark(modes, repeat):
+    results = {}
+    reference = None
+    for mode in modes:
+        try:
+            walls = []
+            counts = {key: 0 for key in FETCH_COUNTS}
+            for _ in range(repeat):
+                data, errors, wall, fetches = scrape(mode == "parallel")
+                if errors:
+                    raise RuntimeError(f"{len(errors)} pages failed: {next(iter(errors.values()))}")
+                walls.append(wall)
+                for key in FETCH_COUNTS:
+                    counts[key] += fetches[key]
+            reference = reference or data
+            results[mode] = {
+                "wall": statistics.median(walls),
+                "symptoms": sum(len(symptoms) for symptoms in data.values()),
+                "same_as_first": data == reference,
+                # Per scrape
+                **{key: counts[key] / repeat for key in FETCH_COUNTS},
+            }
+        except Exception as e:
+            results[mode] = {"error": str(e)}
+    return results
+
+
+def print_results(results, repeat):
+    print(f"\nMedian of {repeat} full scrapes")
+    print(f"{'mode':<10}{'wall s':>9}{'symptoms':>10}{'speedup':>9}{'http':>7}{'selenium':>10}{'fallbacks':>11}  same data")
+    serial = results.get("serial", {}).get("wall")
+    for mode, result in results.items():
+        if "error" in result:
+            print(f"{mode:<10}  failed: {result['error']}")
+            continue
+        speedup = f"{serial / result['wall']:.1f}x" if serial else "-"
+        print(
+            f"{mode:<10}{result['wall']:>9.2f}{result['symptoms']:>10}{speedup:>9}"
+            f"{result['http']:>7.0f}{result['selenium']:>10.0f}{result['fallbacks']:>11.0f}  {result['same_as_first']}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare the serial and parallel troubleshooting scrapes on the replayed synthetic fixture pages.")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--latency", type=float, default=0.2, help="Seconds the replay server adds to every response")
+    parser.add_argument("--fetcher", default=None, help="CRAWLER_FETCHER mode of the parallel scrape: auto, http or selenium")
+    parser.add_argument("--modes", nargs="+", default=["serial", "parallel"], choices=["serial", "parallel"])
+    parser.add_argument("--output", help="Also write the results to this JSON file")
+    args = parser.parse_args()
+
+    server, base_url = start_replay_server(latency=args.latency)
+    os.environ["PARTSELECT_BASE_URL"] = base_url
+    if args.fetcher:
+        os.environ["CRAWLER_FETCHER"] = args.fetcher
+
+    results = benchmark(args.modes, args.repeat)
+    print_results(results, args.repeat)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"base_url": base_url, "latency": args.latency, "repeat": args.repeat, "results": results}, f, indent=2)
+    server.shutdown()
@@ -0,0 +1,297 @@
+import threading
+import sqlite3
+import json
+import atexit
+import time
+import os
+
+from .models.PartInfoModel import PartInfoModel
+from .models.ModelInfoModel import ModelInfoModel
+from .models.ModelCompatibilityModel import ModelCompatibilityModel
+from .PartNumbers import normalize_key
+from .SiteUrls import PARTSELECT_BASE_URL
+
+# Seconds a crawled record is served for, 0 for never expiring
+CATALOG_MAX_AGE = float(os.getenv("CATALOG_MAX_AGE", str(7 * 24 * 3600)))
+
+# Record table and key column of each crawled kind, to find records older than a given age
+RECORD_TABLES = {"part": ("parts", "part_number"), "model": ("models", "model_number")}
+
+
+class CatalogStore:
+    def __init__(self, path=None, max_age=None):
+        """
+        Local store of PartInfoModel/ModelInfoModel records, the repair stories and Q&A of parts, and model
+        Parts listings built by the offline catalog crawler (crawler/CrawlCatalog.py). It also keeps the
+        crawl queue, so an interrupted crawl resumes where it stopped.
+        Records crawled more than max_age seconds ago (CATALOG_MAX_AGE, 0 for never) are not returned by
+        get(), so that lookups fall through to the crawl cache or a live crawl until they are re-crawled.
+        """
+        self.path = path or os.getenv("CATALOG_PATH", "./crawler/catalog.sqlite3")
+        self.max_age = max_age if max_age is not None else CATALOG_MAX_AGE
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS parts (
+                part_number TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                crawled_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS part_feedback (
+                part_number TEXT PRIMARY KEY,
+                stories TEXT NOT NULL,
+                questions TEXT NOT NULL,
+                crawled_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS models (
+                model_number TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                crawled_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS model_parts (
+                model_number TEXT NOT NULL,
+                part_number TEXT NOT NULL,
+                product_link TEXT NOT NULL,
+                PRIMARY KEY (model_number, part_number)
+            );
+            CREATE TABLE IF NOT EXISTS model_listings (
+                model_number TEXT PRIMARY KEY,
+                complete INTEGER NOT NULL,
+                crawled_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS crawl_queue (
+                kind TEXT NOT NULL,
+                key TEXT NOT NULL,
+                url TEXT,
+                status TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                error TEXT,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (kind, key)
+            );
+            """
+        )
+        self._conn.commit()
+
+    def _execute(self, sql, params=()):
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+            self._conn.commit()
+        return rows
+
+    # Records
+
+    def _fresh_since(self):
+        # Oldest crawl time still served by get()
+        return time.time() - self.max_age if self.max_age else 0.0
+
+    def put_part(self, part_number, part_info):
+        self._execute(
+            "INSERT OR REPLACE INTO parts (part_number, value, crawled_at) VALUES (?, ?, ?)",
+            (normalize_key(part_number), part_info.model_dump_json(), time.time()),
+        )
+
+    def get_part(self, part_number):
+        rows = self._execute(
+            "SELECT value FROM parts WHERE part_number = ? AND crawled_at >= ?", (normalize_key(part_number), self._fresh_since())
+        )
+        return PartInfoModel.model_validate_json(rows[0][0]) if rows else None
+
+    def put_part_feedback(self, part_number, stories, questions):
+        """
+        Store the repair stories and questions and answers scraped from a part's page
+        (PartInformation.userStories / qnaList). A list that could not be fetched (None) is stored empty.
+        """
+        self._execute(
+            "INSERT OR REPLACE INTO part_feedback (part_number, stories, questions, crawled_at) VALUES (?, ?, ?, ?)",
+            (normalize_key(part_number), json.dumps(stories or []), json.dumps(questions or []), time.time()),
+        )
+
+    def iter_part_feedback(self):
+        """
+        Every crawled part's stories and Q&A, as dicts with part_number, part_url, stories and questions.
+        """
+        rows = self._execute(
+            "SELECT f.part_number, p.value, f.stories, f.questions FROM part_feedback f "
+            "LEFT JOIN parts p ON p.part_number = f.part_number ORDER BY f.part_number"
+        )
+        return [
+            {
+                "part_number": part_number,
+                "part_url": json.loads(value)["part_url"] if value else None,
+                "stories": json.loads(stories),
+                "questions": json.loads(questions),
+            }
+            for part_number, value, stories, questions in rows
+        ]
+
+    def put_model(self, model_number, model_info):
+        self._execute(
+            "INSERT OR REPLACE INTO models (model_number, value, crawled_at) VALUES (?, ?, ?)",
+            (normalize_key(model_number), model_info.model_dump_json(), time.time()),
+        )
+
+    def get_model(self, model_number):
+        rows = self._execute(
+            "SELECT value FROM models WHERE model_number = ? AND crawled_at >= ?", (normalize_key(model_number), self._fresh_since())
+        )
+        return ModelInfoModel.model_validate_json(rows[0][0]) if rows else None
+
+    def put_model_parts(self, model_number, parts, complete=False):
+        """
+        Store a model's Parts listing. complete is True when every page of the listing was crawled.
+        """
+        model_number = normalize_key(model_number)
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO model_parts (model_number, part_number, product_link) VALUES (?, ?, ?)",
+                [(model_number, normalize_key(part["part_number"]), part["product_link"]) for part in parts],
+            )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO model_listings (model_number, complete, crawled_at) VALUES (?, ?, ?)",
+                (model_number, int(complete), time.time()),
+            )
+            self._conn.commit()
+
+    def get_model_parts(self, model_number):
+        rows = self._execute(
+            "SELECT part_number, product_link FROM model_parts WHERE model_number = ?", (normalize_key(model_number),)
+        )
+        return [{"part_number": part_number, "product_link": product_link} for part_number, product_link in rows]
+
+    def iter_model_parts(self):
+        """
+        Every (model_number, part_number, product_link) row, grouped by model.
+        """
+        return self._execute("SELECT model_number, part_number, product_link FROM model_parts ORDER BY model_number")
+
+    def get_model_listings(self):
+        """
+        Map of model number to whether its Parts listing was crawled completely and when it was crawled.
+        """
+        return {
+            model_number: {"complete": bool(complete), "crawled_at": crawled_at}
+            for model_number, complete, crawled_at in self._execute("SELECT model_number, complete, crawled_at FROM model_listings")
+        }
+
+    def get_compatibility(self, model_number, part_number):
+        """
+        A positive compatibility answer when the part appears in the model's crawled Parts listing, else None.
+        Listings older than max_age are not used.
+        """
+        rows = self._execute(
+            "SELECT mp.product_link FROM model_parts mp JOIN model_listings l ON l.model_number = mp.model_number "
+            "WHERE mp.model_number = ? AND mp.part_number = ? AND l.crawled_at >= ?",
+            (normalize_key(model_number), normalize_key(part_number), self._fresh_since()),
+        )
+        if not rows:
+            return None
+        return ModelCompatibilityModel(
+            compatibility=True,
+            product_link=rows[0][0],
+            model_link=f"{PARTSELECT_BASE_URL}/Models/{model_number}/",
+        )
+
+    def get(self, kind, *numbers):
+        """
+        Look up a record by the same kinds the crawl cache uses: "part", "model" or "compatibility".
+        """
+        if kind == "part":
+            return self.get_part(*numbers)
+        if kind == "model":
+            return self.get_model(*numbers)
+        if kind == "compatibility":
+            return self.get_compatibility(*numbers)
+        raise ValueError(f"Unknown catalog kind: {kind}")
+
+    def counts(self):
+        return {
+            table: self._execute(f"SELECT COUNT(*) FROM {table}")[0][0]
+            for table in ("parts", "part_feedback", "models", "model_parts")
+        }
+
+    # Crawl queue
+
+    def enqueue(self, kind, key, url=None, refresh=False):
+        """
+        Add an item to the crawl queue unless it is already there.
+        With refresh an item already queued, even done, is made pending again with its attempts reset.
+        """
+        if not refresh:
+            self._execute(
+                "INSERT OR IGNORE INTO crawl_queue (kind, key, url, updated_at) VALUES (?, ?, ?, ?)",
+                (kind, normalize_key(key), url, time.time()),
+            )
+            return
+        self._execute(
+            "INSERT INTO crawl_queue (kind, key, url, updated_at) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (kind, key) DO UPDATE SET status = 'pending', attempts = 0, error = NULL, "
+            "url = COALESCE(excluded.url, url), updated_at = excluded.updated_at",
+            (kind, normalize_key(key), url, time.time()),
+        )
+
+    def requeue_stale(self, kind, max_age=None):
+        """
+        Make done items of kind pending again when their record was crawled more than max_age seconds ago
+        (the store's max_age by default), i.e. the ones get() no longer serves. Returns how many were re-queued.
+        """
+        table, column = RECORD_TABLES[kind]
+        max_age = max_age if max_age is not None else self.max_age
+        with self._lock:
+            cursor = self._conn.execute(
+                f"UPDATE crawl_queue SET status = 'pending', attempts = 0, error = NULL, updated_at = ? "
+                f"WHERE kind = ? AND status = 'done' AND key IN (SELECT {column} FROM {table} WHERE crawled_at < ?)",
+                (time.time(), kind, time.time() - max_age),
+            )
+            self._conn.commit()
+        return cursor.rowcount
+
+    def pending(self, kind, max_attempts=3):
+        """
+        Queued items of kind that are not done yet and have attempts left, as (key, url) pairs.
+        """
+        return self._execute(
+            "SELECT key, url FROM crawl_queue WHERE kind = ? AND status != 'done' AND attempts < ? ORDER BY updated_at",
+            (kind, max_attempts),
+        )
+
+    def mark_done(self, kind, key):
+        self._execute(
+            "UPDATE crawl_queue SET status = 'done', attempts = attempts + 1, error = NULL, updated_at = ? WHERE kind = ? AND key = ?",
+            (time.time(), kind, normalize_key(key)),
+        )
+
+    def mark_failed(self, kind, key, error):
+        self._execute(
+            "UPDATE crawl_queue SET status = 'failed', attempts = attempts + 1, error = ?, updated_at = ? WHERE kind = ? AND key = ?",
+            (str(error), time.time(), kind, normalize_key(key)),
+        )
+
+    def queue_status(self):
+        rows = self._execute("SELECT kind, status, COUNT(*) FROM crawl_queue GROUP BY kind, status")
+        status = {}
+        for kind, state, count in rows:
+            status.setdefault(kind, {})[state] = count
+        return status
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_catalog_store():
+    """
+    Return the process-wide catalog store, creating it on first use.
+    """
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = CatalogStore()
+            atexit.register(_store.close)
+        return _store
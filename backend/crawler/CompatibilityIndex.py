@@ -0,0 +1,182 @@
+import numpy as np
+import threading
+import time
+import re
+import os
+
+from .models.ModelCompatibilityModel import ModelCompatibilityModel
+from .PartNumbers import normalize_key
+from .SiteUrls import PARTSELECT_BASE_URL
+from .CatalogStore import CATALOG_MAX_AGE
+
+COMPATIBILITY_INDEX_PATH = os.getenv("COMPATIBILITY_INDEX_PATH", "./crawler/compatibility_index.npz")
+
+
+def part_id(part_number):
+    """
+    Intern a PS number as the integer it carries, e.g. "PS11752778" -> 11752778. None for other part numbers.
+    """
+    match = re.fullmatch(r"PS(\d+)", normalize_key(part_number))
+    return int(match.group(1)) if match else None
+
+
+class CompatibilityIndex:
+    def __init__(self, max_age=None):
+        """
+        Model -> compatible parts index built from crawled model Parts listings.
+        Each model keeps a sorted uint32 array of interned part IDs, product links are stored once per part.
+        Models whose listing was crawled completely also answer "not compatible" without a crawl.
+        Listings crawled more than max_age seconds ago (CATALOG_MAX_AGE, 0 for never) are not used, as in CatalogStore.
+        """
+        self.max_age = max_age if max_age is not None else CATALOG_MAX_AGE
+        self._parts = {}
+        self._complete = {}
+        self._crawled_at = {}
+        self._links = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._parts)
+
+    def add_model(self, model_number, parts, complete=False, crawled_at=None):
+        """
+        Incrementally add (or merge into) one model's listing. parts are dicts with part_number and product_link,
+        crawled_at is when the listing was crawled (now by default).
+        """
+        model_key = normalize_key(model_number)
+        ids = []
+        with self._lock:
+            for part in parts:
+                pid = part_id(part["part_number"])
+                if pid is not None:
+                    ids.append(pid)
+                    self._links[pid] = part["product_link"]
+            existing = self._parts.get(model_key)
+            merged = np.asarray(ids, dtype=np.uint32)
+            if existing is not None:
+                merged = np.concatenate([existing, merged])
+            self._parts[model_key] = np.unique(merged)
+            self._complete[model_key] = complete or self._complete.get(model_key, False)
+            self._crawled_at[model_key] = crawled_at if crawled_at is not None else time.time()
+
+    def lookup(self, model_number, part_number):
+        """
+        True if the part is listed for the model, False if the model's complete listing lacks it,
+        None when the index cannot tell (the listing is missing or older than max_age) and the caller has to crawl.
+        """
+        model_key = normalize_key(model_number)
+        parts = self._parts.get(model_key)
+        pid = part_id(part_number)
+        if parts is None or pid is None:
+            return None
+        if self.max_age and self._crawled_at[model_key] < time.time() - self.max_age:
+            return None
+        position = np.searchsorted(parts, pid)
+        if position < len(parts) and parts[position] == pid:
+            return True
+        return False if self._complete[model_key] else None
+
+    def get_compatibility(self, model_number, part_number):
+        """
+        The ModelCompatibilityModel checkModalCompatibility would return, or None on an index miss.
+        """
+        compatible = self.lookup(model_number, part_number)
+        if compatible is None:
+            return None
+        return ModelCompatibilityModel(
+            compatibility=compatible,
+            product_link=self._links.get(part_id(part_number)) if compatible else None,
+            model_link=f"{PARTSELECT_BASE_URL}/Models/{model_number}/",
+        )
+
+    @classmethod
+    def from_catalog(cls, store):
+        """
+        Bulk load every model Parts listing in the catalog store.
+        """
+        index = cls()
+        listings = store.get_model_listings()
+        grouped = {}
+        for model_number, part_number, product_link in store.iter_model_parts():
+            grouped.setdefault(model_number, []).append({"part_number": part_number, "product_link": product_link})
+        for model_number, parts in grouped.items():
+            listing = listings.get(model_number, {})
+            index.add_model(model_number, parts, listing.get("complete", False), listing.get("crawled_at"))
+        return index
+
+    def save(self, path):
+        """
+        Persist the index as one flat array of part IDs with per-model offsets.
+        The file is replaced at once, so a server reloading it never reads a partly written index.
+        """
+        temp_path = f"{path}.tmp"
+        with self._lock, open(temp_path, "wb") as f:
+            models = sorted(self._parts)
+            lengths = [len(self._parts[model]) for model in models]
+            link_ids = sorted(self._links)
+            np.savez_compressed(
+                f,
+                models=np.asarray(models, dtype=str),
+                offsets=np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64),
+                part_ids=np.concatenate([self._parts[model] for model in models]) if models else np.zeros(0, dtype=np.uint32),
+                complete=np.asarray([self._complete[model] for model in models], dtype=bool),
+                crawled_at=np.asarray([self._crawled_at[model] for model in models], dtype=np.float64),
+                link_ids=np.asarray(link_ids, dtype=np.uint32),
+                links=np.asarray([self._links[pid] for pid in link_ids], dtype=str),
+            )
+        os.replace(temp_path, path)
+        print(f"Compatibility index with {len(models)} models saved to {path}")
+
+    @classmethod
+    def load(cls, path):
+        index = cls()
+        with np.load(path) as data:
+            offsets = data["offsets"]
+            part_ids = data["part_ids"]
+            complete = data["complete"]
+            crawled_at = data["crawled_at"]
+            for i, model in enumerate(data["models"].tolist()):
+                index._parts[model] = part_ids[offsets[i]:offsets[i + 1]]
+                index._complete[model] = bool(complete[i])
+                index._crawled_at[model] = float(crawled_at[i])
+            index._links = dict(zip(data["link_ids"].tolist(), data["links"].tolist()))
+        print(f"Compatibility index with {len(index)} models loaded from {path}")
+        return index
+
+
+def load_compatibility_index(path=None):
+    """
+    Load the compatibility index from path (COMPATIBILITY_INDEX_PATH), or an empty index if it was never built.
+    """
+    path = path or COMPATIBILITY_INDEX_PATH
+    if os.path.exists(path):
+        return CompatibilityIndex.load(path)
+    return CompatibilityIndex()
+
+
+_index = None
+_index_mtime = None
+_index_lock = threading.Lock()
+
+
+def get_compatibility_index():
+    """
+    Return the process-wide compatibility index, loading COMPATIBILITY_INDEX_PATH again whenever the file changed
+    since it was loaded, so that a running server picks up CrawlCatalog.py --discover and --rebuild-index.
+    If the new file cannot be loaded the previous index is kept.
+    """
+    global _index, _index_mtime
+    try:
+        mtime = os.path.getmtime(COMPATIBILITY_INDEX_PATH)
+    except OSError:
+        mtime = None
+    with _index_lock:
+        if _index is None or mtime != _index_mtime:
+            try:
+                _index = load_compatibility_index()
+                _index_mtime = mtime
+            except Exception as e:
+                print(f"Error loading compatibility index from {COMPATIBILITY_INDEX_PATH}: {e}")
+                if _index is None:
+                    _index = CompatibilityIndex()
+        return _index
@@ -0,0 +1,222 @@
+import threading
+import asyncio
+import sqlite3
+import atexit
+import time
+import os
+
+from .models.PartInfoModel import PartInfoModel
+from .models.ModelInfoModel import ModelInfoModel
+from .models.ModelCompatibilityModel import ModelCompatibilityModel
+
+# Pydantic model stored for each kind of cached lookup
+CACHE_MODELS = {
+    "part": PartInfoModel,
+    "model": ModelInfoModel,
+    "compatibility": ModelCompatibilityModel,
+}
+
+# Seconds a cached lookup is considered fresh. Prices and availability change faster than model pages.
+DEFAULT_TTLS = {
+    "part": float(os.getenv("CRAWL_CACHE_PART_TTL", str(24 * 3600))),
+    "model": float(os.getenv("CRAWL_CACHE_MODEL_TTL", str(7 * 24 * 3600))),
+    "compatibility": float(os.getenv("CRAWL_CACHE_COMPATIBILITY_TTL", str(30 * 24 * 3600))),
+}
+
+
+class CrawlCache:
+    def __init__(self, path=None, max_entries=None, ttls=None, stale_ttl=None, access_flush_interval=None):
+        """
+        SQLite cache of crawled PartInfoModel, ModelInfoModel and ModelCompatibilityModel results.
+        path is the SQLite file, max_entries bounds the number of rows (least recently used rows are evicted),
+        ttls maps each kind to the seconds an entry stays fresh and stale_ttl is how long past its TTL an
+        entry is still served while it is refreshed in the background.
+        Cache hits do not write: their access times are kept in memory and written together at most every
+        access_flush_interval seconds (CRAWL_CACHE_ACCESS_FLUSH_SECONDS), and before rows are evicted.
+        """
+        self.path = path or os.getenv("CRAWL_CACHE_PATH", "./crawler/crawl_cache.sqlite3")
+        self.max_entries = max_entries or int(os.getenv("CRAWL_CACHE_MAX_ENTRIES", "50000"))
+        self.ttls = {**DEFAULT_TTLS, **(ttls or {})}
+        self.stale_ttl = stale_ttl if stale_ttl is not None else float(os.getenv("CRAWL_CACHE_STALE_TTL", str(24 * 3600)))
+        self.access_flush_interval = (
+            access_flush_interval if access_flush_interval is not None else float(os.getenv("CRAWL_CACHE_ACCESS_FLUSH_SECONDS", "30"))
+        )
+        # Access times of hits not written yet, keyed by (kind, key)
+        self._accessed = {}
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+        self._refreshing = set()
+        self._refresh_tasks = set()
+        self.stats = {"hits": 0, "stale_hits": 0, "misses": 0, "refreshes": 0, "evictions": 0}
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS crawl_cache (
+                kind TEXT NOT NULL,
+                key TEXT NOT NULL,
+                value TEXT NOT NULL,
+                fetched_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                PRIMARY KEY (kind, key)
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS crawl_cache_accessed_at ON crawl_cache (accessed_at)")
+        self._conn.commit()
+        # Kept up to date by put() and eviction, so that writes do not count the table
+        (self._rows,) = self._conn.execute("SELECT COUNT(*) FROM crawl_cache").fetchone()
+
+    def _count(self, key, n=1):
+        with self._lock:
+            self.stats[key] += n
+
+    def get(self, kind, key):
+        """
+        Return (model, age_in_seconds) for a cached entry or (None, None) when it is missing.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, fetched_at FROM crawl_cache WHERE kind = ? AND key = ?", (kind, key)
+            ).fetchone()
+            if row is None:
+                return None, None
+            self._accessed[(kind, key)] = time.time()
+            if time.monotonic() - self._last_flush >= self.access_flush_interval:
+                self._flush_accesses()
+                self._conn.commit()
+        value, fetched_at = row
+        return CACHE_MODELS[kind].model_validate_json(value), time.time() - fetched_at
+
+    def _flush_accesses(self):
+        # Called with the lock held, the caller commits
+        if self._accessed:
+            self._conn.executemany(
+                "UPDATE crawl_cache SET accessed_at = ? WHERE kind = ? AND key = ?",
+                [(accessed_at, kind, key) for (kind, key), accessed_at in self._accessed.items()],
+            )
+            self._accessed = {}
+        self._last_flush = time.monotonic()
+
+    def put(self, kind, key, model):
+        now = time.time()
+        with self._lock:
+            self._accessed.pop((kind, key), None)
+            updated = self._conn.execute(
+                "UPDATE crawl_cache SET value = ?, fetched_at = ?, accessed_at = ? WHERE kind = ? AND key = ?",
+                (model.model_dump_json(), now, now, kind, key),
+            ).rowcount
+            if not updated:
+                self._conn.execute(
+                    "INSERT INTO crawl_cache (kind, key, value, fetched_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                    (kind, key, model.model_dump_json(), now, now),
+                )
+                self._rows += 1
+                # Only an added row can take the cache over max_entries
+                overflow = self._rows - self.max_entries
+                if overflow > 0:
+                    # Evict by up-to-date access times
+                    self._flush_accesses()
+                    evicted = self._conn.execute(
+                        "DELETE FROM crawl_cache WHERE rowid IN (SELECT rowid FROM crawl_cache ORDER BY accessed_at LIMIT ?)",
+                        (overflow,),
+                    ).rowcount
+                    self._rows -= evicted
+                    self.stats["evictions"] += evicted
+            self._conn.commit()
+
+    def _refresh(self, kind, key, fetch):
+        try:
+            self.put(kind, key, fetch())
+            self._count("refreshes")
+        except Exception as e:
+            print(f"Error refreshing cached {kind} {key}: {e}")
+        finally:
+            with self._lock:
+                self._refreshing.discard((kind, key))
+
+    def _refresh_in_background(self, kind, key, fetch):
+        with self._lock:
+            if (kind, key) in self._refreshing:
+                return
+            self._refreshing.add((kind, key))
+        threading.Thread(target=self._refresh, args=(kind, key, fetch), daemon=True).start()
+
+    def get_or_fetch(self, kind, key, fetch):
+        """
+        Return the cached model for (kind, key), calling fetch() to crawl it on a miss.
+        Entries past their TTL but within stale_ttl are returned immediately and refreshed in the background.
+        """
+        model, age = self.get(kind, key)
+        if model is not None:
+            ttl = self.ttls[kind]
+            if age <= ttl:
+                self._count("hits")
+                return model
+            if age <= ttl + self.stale_ttl:
+                self._count("stale_hits")
+                self._refresh_in_background(kind, key, fetch)
+                return model
+        self._count("misses")
+        model = fetch()
+        self.put(kind, key, model)
+        return model
+
+    async def _arefresh(self, kind, key, fetch):
+        try:
+            await asyncio.to_thread(self.put, kind, key, await fetch())
+            self._count("refreshes")
+        except Exception as e:
+            print(f"Error refreshing cached {kind} {key}: {e}")
+        finally:
+            with self._lock:
+                self._refreshing.discard((kind, key))
+
+    async def aget_or_fetch(self, kind, key, fetch):
+        """
+        Async variant of get_or_fetch where fetch is a coroutine function, e.g. a crawl submitted to the
+        crawl executor. The SQLite reads and writes run on a worker thread, so a busy database file does not
+        block the event loop.
+        """
+        model, age = await asyncio.to_thread(self.get, kind, key)
+        if model is not None:
+            ttl = self.ttls[kind]
+            if age <= ttl:
+                self._count("hits")
+                return model
+            if age <= ttl + self.stale_ttl:
+                self._count("stale_hits")
+                with self._lock:
+                    refreshing = (kind, key) in self._refreshing
+                    self._refreshing.add((kind, key))
+                if not refreshing:
+                    task = asyncio.ensure_future(self._arefresh(kind, key, fetch))
+                    self._refresh_tasks.add(task)
+                    task.add_done_callback(self._refresh_tasks.discard)
+                return model
+        self._count("misses")
+        model = await fetch()
+        await asyncio.to_thread(self.put, kind, key, model)
+        return model
+
+    def close(self):
+        with self._lock:
+            self._flush_accesses()
+            self._conn.commit()
+            self._conn.close()
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_crawl_cache():
+    """
+    Return the process-wide crawl cache, creating it on first use.
+    """
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = CrawlCache()
+            atexit.register(_cache.close)
+        return _cache
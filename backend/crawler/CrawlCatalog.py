@@ -0,0 +1,123 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import argparse
+import time
+
+from .PartInformation import PartInformation
+from .ModelInformation import ModelInformation
+from .ModelParts import getModelParts
+from .CatalogStore import get_catalog_store
+from .SiteUrls import PARTSELECT_BASE_URL
+from .CompatibilityIndex import CompatibilityIndex, load_compatibility_index, COMPATIBILITY_INDEX_PATH
+
+
+def part_search_url(part_number):
+    return f"{PARTSELECT_BASE_URL}/api/search/?searchterm={part_number}&SearchMethod=standard"
+
+
+def crawl_model(store, index, model_number, discover_parts, max_part_pages, refresh=False):
+    model_info = ModelInformation(f"{PARTSELECT_BASE_URL}/Models/{model_number}/").getmodelInfoModel()
+    store.put_model(model_number, model_info)
+    if discover_parts:
+        parts = getModelParts(model_number, max_pages=max_part_pages)
+        complete = max_part_pages is None
+        store.put_model_parts(model_number, parts, complete)
+        index.add_model(model_number, parts, complete)
+        for part in parts:
+            store.enqueue("part", part["part_number"], part["product_link"], refresh)
+        print(f"Discovered {len(parts)} parts for model {model_number}")
+
+
+def crawl_part(store, part_number, url):
+    information = PartInformation(url or part_search_url(part_number))
+    store.put_part(part_number, information.getPartInfoModel())
+    # Repair stories and Q&A for the part knowledge index (knowledge_base/IndexPartKnowledge.py)
+    if information.userStories is not None or information.qnaList is not None:
+        store.put_part_feedback(part_number, information.userStories, information.qnaList)
+
+
+def run_queue(store, kind, crawl, workers, max_attempts):
+    """
+    Crawl every pending item of kind concurrently, marking each done or failed as it finishes.
+    """
+    pending = store.pending(kind, max_attempts)
+    print(f"Crawling {len(pending)} {kind}s with {workers} workers")
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(crawl, key, url): key for key, url in pending}
+        for done, future in enumerate(as_completed(futures), 1):
+            key = futures[future]
+            try:
+                future.result()
+                store.mark_done(kind, key)
+            except Exception as e:
+                print(f"Error crawling {kind} {key}: {e}")
+                store.mark_failed(kind, key, e)
+            if done % 25 == 0:
+                print(f"{done}/{len(pending)} {kind}s crawled")
+    print(f"Crawled {len(pending)} {kind}s in {time.perf_counter() - start:.1f}s")
+
+
+def crawl_catalog(part_numbers=(), model_numbers=(), discover_parts=False, max_part_pages=None, workers=4, max_attempts=3,
+                  refresh=False, refresh_stale=False):
+    """
+    Crawl models (and, with discover_parts, the parts listed on their Parts pages) and parts into the
+    local catalog store. The queue lives in the store, so re-running after an interruption only crawls
+    what is not done yet, and failed items are retried up to max_attempts times.
+    refresh crawls the given models and parts (and the parts discovered on them) again even if they are done,
+    refresh_stale crawls again every part and model older than the store's max_age (CATALOG_MAX_AGE).
+    Discovered Parts listings are also added to the compatibility index.
+    """
+    store = get_catalog_store()
+    index = load_compatibility_index()
+    for model_number in model_numbers:
+        store.enqueue("model", model_number, refresh=refresh)
+    for part_number in part_numbers:
+        store.enqueue("part", part_number, refresh=refresh)
+    if refresh_stale:
+        for kind in ("model", "part"):
+            print(f"Re-queued {store.requeue_stale(kind)} stale {kind}s")
+
+    run_queue(
+        store,
+        "model",
+        lambda key, url: crawl_model(store, index, key, discover_parts, max_part_pages, refresh),
+        workers,
+        max_attempts,
+    )
+    run_queue(store, "part", lambda key, url: crawl_part(store, key, url), workers, max_attempts)
+    index.save(COMPATIBILITY_INDEX_PATH)
+
+    print(f"Catalog: {store.counts()}")
+    print(f"Queue: {store.queue_status()}")
+
+
+def read_seed_file(path):
+    with open(path) as f:
+        return [line.strip() for line in f if line.strip() and not line.startswith("#")]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Crawl PartSelect parts and models into the local catalog store.")
+    parser.add_argument("--parts", nargs="*", default=[], help="PS numbers to crawl")
+    parser.add_argument("--models", nargs="*", default=[], help="Model numbers to crawl")
+    parser.add_argument("--parts-file", help="File with one PS number per line")
+    parser.add_argument("--models-file", help="File with one model number per line")
+    parser.add_argument("--discover", action="store_true", help="Also crawl every part listed on each model's Parts pages")
+    parser.add_argument("--max-part-pages", type=int, default=None, help="Limit the Parts pages read per model")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--refresh", action="store_true", help="Crawl the given models and parts again even if already crawled")
+    parser.add_argument("--refresh-stale", action="store_true", help="Crawl again every part and model older than CATALOG_MAX_AGE")
+    parser.add_argument("--rebuild-index", action="store_true", help="Rebuild the compatibility index from the whole catalog and exit")
+    args = parser.parse_args()
+
+    if args.rebuild_index:
+        CompatibilityIndex.from_catalog(get_catalog_store()).save(COMPATIBILITY_INDEX_PATH)
+        raise SystemExit(0)
+
+    part_numbers = args.parts + (read_seed_file(args.parts_file) if args.parts_file else [])
+    model_numbers = args.models + (read_seed_file(args.models_file) if args.models_file else [])
+    crawl_catalog(
+        part_numbers, model_numbers, args.discover, args.max_part_pages, args.workers,
+        refresh=args.refresh, refresh_stale=args.refresh_stale,
+    )
+    print("Catalog crawl completed.")
@@ -0,0 +1,98 @@
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import asyncio
+import atexit
+import os
+
+
+class CrawlRejected(Exception):
+    """Raised when too many crawls are already queued or running."""
+
+
+class CrawlExecutor:
+    def __init__(self, max_workers=None, max_queue=None, timeout=None, tool_limits=None):
+        """
+        Runs blocking crawler code on a dedicated thread pool so it never blocks the asyncio event loop.
+        max_workers is the number of crawler threads, max_queue the number of crawls that may be queued or
+        running before new ones are rejected, timeout the seconds a caller waits for a crawl and
+        tool_limits the number of concurrent crawls allowed per tool.
+        """
+        self.max_workers = max_workers or int(os.getenv("CRAWL_EXECUTOR_WORKERS", "4"))
+        self.max_queue = max_queue or int(os.getenv("CRAWL_MAX_QUEUE", "32"))
+        self.timeout = timeout or float(os.getenv("CRAWL_TIMEOUT", "60"))
+        self.tool_limits = {
+            "part": int(os.getenv("CRAWL_LIMIT_PART", "2")),
+            "model": int(os.getenv("CRAWL_LIMIT_MODEL", "2")),
+            "compatibility": int(os.getenv("CRAWL_LIMIT_COMPATIBILITY", "2")),
+            **(tool_limits or {}),
+        }
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="crawl")
+        self._semaphores = {}
+        self._lock = threading.Lock()
+        self._pending = 0
+        self.stats = {"submitted": 0, "completed": 0, "failed": 0, "rejected": 0, "timeouts": 0, "cancelled": 0}
+
+    def _count(self, key):
+        with self._lock:
+            self.stats[key] += 1
+
+    def _semaphore(self, tool):
+        if tool not in self._semaphores:
+            self._semaphores[tool] = asyncio.Semaphore(self.tool_limits.get(tool, self.max_workers))
+        return self._semaphores[tool]
+
+    def queue_depth(self):
+        return self._pending
+
+    async def run(self, tool, fn, *args):
+        """
+        Run the blocking fn(*args) on the crawler thread pool, at most tool_limits[tool] at a time.
+        Raises CrawlRejected when the queue is full and TimeoutError when the crawl takes longer than timeout.
+        If the caller is cancelled or times out before the crawl has started, the crawl is dropped;
+        a crawl that is already running finishes on its thread and its result is discarded.
+        """
+        if self._pending >= self.max_queue:
+            self._count("rejected")
+            raise CrawlRejected(f"{self._pending} crawls already queued, try again shortly")
+        self._pending += 1
+        self._count("submitted")
+        try:
+            async with self._semaphore(tool):
+                future = asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+                try:
+                    result = await asyncio.wait_for(future, self.timeout)
+                except asyncio.TimeoutError:
+                    if not future.cancelled():
+                        # fn itself raised a TimeoutError (e.g. no free driver in the pool)
+                        raise
+                    self._count("timeouts")
+                    raise TimeoutError(f"{tool} crawl did not finish within {self.timeout}s")
+            self._count("completed")
+            return result
+        except asyncio.CancelledError:
+            self._count("cancelled")
+            raise
+        except Exception:
+            self._count("failed")
+            raise
+        finally:
+            self._pending -= 1
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_crawl_executor():
+    """
+    Return the process-wide crawl executor, creating it on first use.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = CrawlExecutor()
+            atexit.register(_executor.shutdown)
+        return _executor
@@ -0,0 +1,196 @@
+from selenium import webdriver
+from selenium.webdriver.chrome.service import Service
+from selenium.webdriver.chrome.options import Options
+from selenium.common.exceptions import WebDriverException
+from webdriver_manager.chrome import ChromeDriverManager
+from contextlib import contextmanager
+import threading
+import atexit
+import queue
+import time
+import os
+
+USER_AGENT = "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/89.0.4389.82 Safari/537.36"
+
+
+def build_chrome_options():
+    """
+    Chrome options shared by every crawler browser.
+    """
+    chrome_options = Options()
+    chrome_options.add_argument("--headless=new")  # Enable headless mode
+    chrome_options.add_argument("--disable-gpu")
+    chrome_options.add_argument("--no-sandbox")
+    chrome_options.add_argument("--disable-dev-shm-usage")
+    chrome_options.add_argument("--disable-blink-features=AutomationControlled")
+    chrome_options.add_argument(f"user-agent={USER_AGENT}")
+    chrome_options.add_argument("window-size=1920,1080")
+    chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
+    chrome_options.add_experimental_option("useAutomationExtension", False)
+    # Return at DOMContentLoaded, readiness is decided by the selectors each parser waits for
+    chrome_options.page_load_strategy = "eager"
+    return chrome_options
+
+
+class PooledDriver:
+    """
+    Wraps a Chrome webdriver owned by a DriverPool and counts the pages it has loaded.
+    Everything except get() is delegated to the underlying driver.
+    """
+    def __init__(self, driver):
+        self.driver = driver
+        self.page_count = 0
+        self.created_at = time.monotonic()
+        self.broken = False
+
+    def get(self, url):
+        self.page_count += 1
+        try:
+            return self.driver.get(url)
+        except WebDriverException:
+            self.broken = True
+            raise
+
+    def is_healthy(self):
+        """
+        A driver is healthy if the browser still answers a trivial command.
+        """
+        if self.broken:
+            return False
+        try:
+            self.driver.current_url
+            return True
+        except Exception:
+            return False
+
+    def quit(self):
+        try:
+            self.driver.quit()
+        except Exception as e:
+            print(f"Error quitting driver: {e}")
+
+    def __getattr__(self, name):
+        return getattr(self.driver, name)
+
+
+class DriverPool:
+    def __init__(self, size=None, max_pages=None, lease_timeout=None, warm=0):
+        """
+        size is the maximum number of Chrome instances alive at the same time.
+        max_pages is the number of page loads after which a driver is recycled.
+        lease_timeout is how long lease() waits for a free driver before giving up.
+        warm is the number of drivers started up front instead of on first lease.
+        chromedriver is resolved (downloaded by webdriver_manager if needed) when the first driver is started,
+        so creating a pool that is never leased from, e.g. with CRAWLER_FETCHER=http, touches neither Chrome nor the network.
+        """
+        self.size = size if size is not None else int(os.getenv("DRIVER_POOL_SIZE", "3"))
+        if self.size < 1:
+            raise ValueError(f"Driver pool size must be at least 1, got {self.size}")
+        self.max_pages = max_pages if max_pages is not None else int(os.getenv("DRIVER_POOL_MAX_PAGES", "50"))
+        if self.max_pages < 1:
+            raise ValueError(f"Driver pool max_pages must be at least 1, got {self.max_pages}")
+        self.lease_timeout = lease_timeout if lease_timeout is not None else float(os.getenv("DRIVER_POOL_LEASE_TIMEOUT", "60"))
+        self.page_load_timeout = float(os.getenv("DRIVER_PAGE_LOAD_TIMEOUT", "30"))
+        self.service_path = None
+        self.chrome_options = build_chrome_options()
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(self.size)
+        self._lock = threading.Lock()
+        self._closed = False
+        self.stats = {"created": 0, "recycled": 0, "crashed": 0, "leases": 0, "startup_seconds": 0.0}
+        for _ in range(min(warm, self.size)):
+            self._idle.put(self._create_driver())
+
+    def _resolve_service_path(self):
+        # Resolve chromedriver once for the lifetime of the pool
+        with self._lock:
+            if self.service_path is None:
+                self.service_path = ChromeDriverManager().install()
+            return self.service_path
+
+    def _create_driver(self):
+        start = time.perf_counter()
+        self._resolve_service_path()
+        driver = webdriver.Chrome(service=Service(self.service_path), options=self.chrome_options)
+        driver.set_page_load_timeout(self.page_load_timeout)
+        with self._lock:
+            self.stats["created"] += 1
+            self.stats["startup_seconds"] += time.perf_counter() - start
+        return PooledDriver(driver)
+
+    def _discard(self, pooled, reason):
+        with self._lock:
+            self.stats[reason] += 1
+        pooled.quit()
+
+    def _checkout(self):
+        while True:
+            try:
+                pooled = self._idle.get_nowait()
+            except queue.Empty:
+                return self._create_driver()
+            if pooled.is_healthy():
+                return pooled
+            self._discard(pooled, "crashed")
+
+    def _checkin(self, pooled):
+        if self._closed:
+            pooled.quit()
+        elif pooled.broken:
+            self._discard(pooled, "crashed")
+        elif pooled.page_count >= self.max_pages:
+            self._discard(pooled, "recycled")
+        else:
+            self._idle.put(pooled)
+
+    @contextmanager
+    def lease(self):
+        """
+        Borrow a driver for the duration of the with block and return it to the pool afterwards.
+        Drivers that raised a WebDriverException are treated as crashed and replaced.
+        """
+        if self._closed:
+            raise RuntimeError("Driver pool is closed")
+        if not self._slots.acquire(timeout=self.lease_timeout):
+            raise TimeoutError(f"No Chrome driver available after {self.lease_timeout}s")
+        pooled = None
+        try:
+            pooled = self._checkout()
+            with self._lock:
+                self.stats["leases"] += 1
+            yield pooled
+        except WebDriverException:
+            if pooled:
+                pooled.broken = True
+            raise
+        finally:
+            if pooled:
+                self._checkin(pooled)
+            self._slots.release()
+
+    def close(self):
+        """
+        Quit every idle driver. Drivers that are still leased are quit when they are returned.
+        """
+        self._closed = True
+        while True:
+            try:
+                self._idle.get_nowait().quit()
+            except queue.Empty:
+                break
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_driver_pool():
+    """
+    Return the process-wide driver pool, creating it on first use.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = DriverPool()
+            atexit.register(_pool.close)
+        return _pool
@@ -0,0 +1,274 @@
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from functools import cached_property
+import threading
+import asyncio
+import atexit
+import httpx
+import time
+import os
+
+from .DriverPool import get_driver_pool, USER_AGENT
+from .PageReadiness import load_page, required_selectors
+from .HtmlParser import parse_page
+
+@dataclass
+class FetchResult:
+    """
+    The HTML of a fetched page and how it was obtained.
+    url is the final URL after redirects and source is either "http" or "selenium".
+    page_type selects the containers soup parses (see HtmlParser.PAGE_CONTAINERS).
+    """
+    url: str
+    html: str
+    source: str
+    status: int = 200
+    elapsed: float = 0.0
+    timings: dict = field(default_factory=dict)
+    page_type: str = "document"
+
+    @cached_property
+    def soup(self):
+        return parse_page(self.html, self.page_type)
+
+
+@dataclass
+class MultiFetchResult:
+    """
+    Pages fetched concurrently by PageFetcher.fetch_many, keyed by the name they were requested under.
+    A sub-fetch that failed has an entry in errors instead of results, timings holds every sub-fetch.
+    """
+    results: dict = field(default_factory=dict)
+    errors: dict = field(default_factory=dict)
+    timings: dict = field(default_factory=dict)
+    elapsed: float = 0.0
+
+    @property
+    def ok(self):
+        return not self.errors
+
+
+def has_selectors(soup, selectors):
+    """
+    True when every CSS selector in selectors matches at least one element.
+    """
+    return all(soup.select_one(selector) is not None for selector in selectors)
+
+
+class HttpFetcher:
+    def __init__(self, timeout=None, max_connections=None, http2=True):
+        """
+        Pooled async httpx client with keep-alive and HTTP/2.
+        The client lives on its own event loop thread so that synchronous crawler code and
+        coroutines running on other loops can share the same connection pool.
+        """
+        self.timeout = timeout or float(os.getenv("HTTP_FETCH_TIMEOUT", "15"))
+        self.max_connections = max_connections or int(os.getenv("HTTP_FETCH_MAX_CONNECTIONS", "20"))
+        self.http2 = http2
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="http-fetcher", daemon=True)
+        self._thread.start()
+        self._client = self._submit(self._create_client()).result()
+
+    async def _create_client(self):
+        return httpx.AsyncClient(
+            http2=self.http2,
+            timeout=self.timeout,
+            follow_redirects=True,
+            headers={"User-Agent": USER_AGENT},
+            limits=httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_connections,
+            ),
+        )
+
+    def _submit(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self._loop)
+
+    async def _get(self, url, page_type="document"):
+        start = time.perf_counter()
+        response = await self._client.get(url)
+        response.raise_for_status()
+        elapsed = time.perf_counter() - start
+        return FetchResult(
+            url=str(response.url),
+            html=response.text,
+            source="http",
+            status=response.status_code,
+            elapsed=elapsed,
+            timings={"fetch": elapsed},
+            page_type=page_type,
+        )
+
+    async def _resolve(self, url):
+        response = await self._client.head(url, follow_redirects=False)
+        if response.is_redirect:
+            return str(response.url.join(response.headers["Location"]))
+        return str(response.url)
+
+    def fetch(self, url, page_type="document"):
+        return self._submit(self._get(url, page_type)).result()
+
+    def resolve(self, url):
+        """
+        Where url redirects to, from a HEAD request so the target page is not downloaded, or url itself
+        when it does not redirect. Only the first redirect is followed.
+        """
+        return self._submit(self._resolve(url)).result()
+
+    async def afetch(self, url, page_type="document"):
+        return await asyncio.wrap_future(self._submit(self._get(url, page_type)))
+
+    def close(self):
+        if self._loop.is_closed():
+            return
+        self._submit(self._client.aclose()).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+
+class SeleniumFetcher:
+    def __init__(self, pool=None):
+        """
+        Loads pages in a Chrome driver borrowed from the driver pool.
+        """
+        self.pool = pool
+
+    def fetch(self, url, page_type="document"):
+        pool = self.pool or get_driver_pool()
+        start = time.perf_counter()
+        with pool.lease() as driver:
+            ready = load_page(driver, url, page_type)
+            html = driver.page_source
+            final_url = driver.current_url
+        elapsed = time.perf_counter() - start
+        return FetchResult(url=final_url, html=html, source="selenium", elapsed=elapsed, timings={"fetch": elapsed, "ready": ready}, page_type=page_type)
+
+
+class PageFetcher:
+    def __init__(self, mode=None, http=None, browser=None):
+        """
+        mode is one of:
+          "auto"     - fetch over HTTP and fall back to Selenium when required selectors are missing
+          "http"     - HTTP only
+          "selenium" - always render in Chrome
+        """
+        self.mode = mode or os.getenv("CRAWLER_FETCHER", "auto")
+        self.http = http
+        self.browser = browser or SeleniumFetcher()
+        if self.mode != "selenium" and self.http is None:
+            self.http = HttpFetcher()
+        self.stats = {"http": 0, "selenium": 0, "fallbacks": 0, "fetch_seconds": 0.0}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(
+            max_workers=int(os.getenv("FETCH_WORKERS", "8")),
+            thread_name_prefix="page-fetch",
+        )
+
+    def _count(self, key, amount=1):
+        with self._lock:
+            self.stats[key] += amount
+
+    def fetch(self, url, page_type="document"):
+        """
+        Fetch url and return a FetchResult whose HTML contains the selectors the page_type parser requires.
+        """
+        result = self._fetch(url, page_type)
+        # Network (or browser load) time only, parsing for the selector check is not included
+        self._count("fetch_seconds", result.elapsed)
+        return result
+
+    def _fetch(self, url, page_type):
+        if self.mode != "selenium":
+            try:
+                result = self.http.fetch(url, page_type)
+                selectors = required_selectors(page_type)
+                if self.mode == "http" or has_selectors(result.soup, selectors):
+                    self._count("http")
+                    return result
+                print(f"Missing selectors {selectors} on {url}, falling back to Selenium")
+            except httpx.HTTPError as e:
+                if self.mode == "http":
+                    raise
+                print(f"HTTP fetch failed for {url}: {e}, falling back to Selenium")
+            self._count("fallbacks")
+        self._count("selenium")
+        return self.browser.fetch(url, page_type)
+
+    def resolve(self, url):
+        """
+        The URL url redirects to (see HttpFetcher.resolve), or None when it cannot be resolved over HTTP,
+        in selenium mode or when the HEAD request fails. The page then has to be fetched to find where it lands.
+        """
+        if self.http is None:
+            return None
+        try:
+            return self.http.resolve(url)
+        except httpx.HTTPError as e:
+            print(f"Could not resolve {url}: {e}")
+            return None
+
+    def _timed_fetch(self, url, page_type):
+        start = time.perf_counter()
+        try:
+            return self.fetch(url, page_type), None, time.perf_counter() - start
+        except Exception as e:
+            return None, e, time.perf_counter() - start
+
+    def fetch_iter(self, requests):
+        """
+        Start fetching every page in requests (name -> (url, page_type)) at once and yield
+        (name, result, error, elapsed) in request order, each as soon as that page is in.
+        Parallelism is bounded by the FETCH_WORKERS fetch threads.
+        """
+        futures = {
+            name: self._executor.submit(self._timed_fetch, url, page_type)
+            for name, (url, page_type) in requests.items()
+        }
+        try:
+            for name, future in futures.items():
+                yield (name, *future.result())
+        finally:
+            # The consumer stopped early, do not fetch pages nobody will read
+            for future in futures.values():
+                future.cancel()
+
+    def fetch_many(self, requests):
+        """
+        Fetch several pages at the same time. requests maps a name to a (url, page_type) pair.
+        Each page goes over its own HTTP connection or its own pooled Chrome driver, so the
+        total time is that of the slowest page. One failing page does not fail the others.
+        """
+        start = time.perf_counter()
+        combined = MultiFetchResult()
+        for name, result, error, elapsed in self.fetch_iter(requests):
+            combined.timings[name] = elapsed
+            if error is None:
+                combined.results[name] = result
+            else:
+                print(f"Error fetching {name} ({requests[name][0]}): {error}")
+                combined.errors[name] = error
+        combined.elapsed = time.perf_counter() - start
+        return combined
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+        if self.http:
+            self.http.close()
+
+
+_fetcher = None
+_fetcher_lock = threading.Lock()
+
+
+def get_fetcher():
+    """
+    Return the process-wide page fetcher, creating it on first use.
+    """
+    global _fetcher
+    with _fetcher_lock:
+        if _fetcher is None:
+            _fetcher = PageFetcher()
+            atexit.register(_fetcher.close)
+        return _fetcher
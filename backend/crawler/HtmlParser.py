@@ -0,0 +1,126 @@
+from bs4 import BeautifulSoup
+import threading
+import time
+import os
+
+try:
+    import lxml.html
+    from lxml import etree
+except ImportError:  # lxml is optional, BeautifulSoup's built-in parser is used without it
+    lxml = None
+
+# BeautifulSoup tree builder used for every page. HTML_PARSER=html.parser restores the original behaviour.
+HTML_PARSER = os.getenv("HTML_PARSER", "lxml" if lxml else "html.parser")
+
+
+def _has_class(name):
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+def _class_is(value):
+    # BeautifulSoup's class_="a b" matches the whole class attribute
+    return f"normalize-space(@class)='{value}'"
+
+
+# XPath of the containers each page type's extractor reads. Only these subtrees are turned into a
+# BeautifulSoup tree, the navigation, scripts and footer around them are skipped.
+PAGE_CONTAINERS = {
+    "part": " | ".join([
+        f"//div[{_has_class('main-image-container')}]",
+        f"//div[{_has_class('pd__img__thumbs')}]",
+        f"//div[{_has_class('pd__description')}]",
+        f"//*[{_has_class('pd__wrap')} and {_has_class('row')}]",
+        f"//div[{_has_class('yt-video')}]",
+        f"//span[{_has_class('pd__price')}]",
+        f"//div[{_has_class('js-partAvailability')}]",
+        "//*[@itemprop='productID']",
+        "//*[@itemprop='mpn']",
+        f"//*[{_has_class('pd__repair-rating')}]",
+        "//a[@href='#CustomerReviews']",
+    ]),
+    "repair_stories": f"//div[{_has_class('repair-story')}]",
+    "questions_and_answers": f"//div[{_has_class('qna__question')}]",
+    "model": " | ".join([
+        f"//h1[{_has_class('title-main')}]",
+        f"//div[{_class_is('d-flex flex-wrap mt-2 mb-4')}]",
+        f"//div[{_class_is('row mb-3')}]",
+        f"//div[{_has_class('yt-video')}]",
+        f"//li[{_has_class('next')}]",
+    ]),
+    "model_parts": " | ".join([
+        f"//h1[{_has_class('title-main')}]",
+        f"//div[{_has_class('mega-m__part')}]",
+        f"//ul[li[{_has_class('next')}]]",
+    ]),
+    "model_videos": " | ".join([
+        f"//h1[{_has_class('title-main')}]",
+        f"//div[{_has_class('yt-video')}]",
+        f"//ul[li[{_has_class('next')}]]",
+    ]),
+    "repair": f"//div[{_has_class('symptom-list')}]",
+    "symptom": " | ".join([
+        f"//img[{_has_class('yt-video__thumb')}]",
+        f"//div[{_has_class('symptom-list')}]",
+        f"//div[{_has_class('symptom-list__desc')}]",
+    ]),
+}
+
+
+def _containers_html(html, xpath):
+    """
+    Serialize the outermost elements matching xpath, in document order.
+    """
+    root = lxml.html.document_fromstring(html)
+    kept = set()
+    fragments = []
+    for element in root.xpath(xpath):
+        # Nested matches are already part of an enclosing container
+        if any(ancestor in kept for ancestor in element.iterancestors()):
+            continue
+        kept.add(element)
+        fragments.append(etree.tostring(element, encoding="unicode", method="html", with_tail=False))
+    return "".join(fragments)
+
+
+class ParseStats:
+    def __init__(self):
+        """
+        Records how many pages of each type were parsed and how long parsing took.
+        """
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def record(self, page_type, elapsed):
+        with self._lock:
+            stats = self._stats.setdefault(page_type or "document", {"pages": 0, "parse_seconds": 0.0})
+            stats["pages"] += 1
+            stats["parse_seconds"] += elapsed
+
+    def summary(self):
+        with self._lock:
+            return {page_type: dict(stats) for page_type, stats in self._stats.items()}
+
+
+parse_stats = ParseStats()
+
+
+def _parse(html, page_type, parser):
+    xpath = PAGE_CONTAINERS.get(page_type)
+    if lxml is not None and parser == "lxml" and xpath and html.strip():
+        try:
+            return BeautifulSoup(_containers_html(html, xpath), parser)
+        except (ValueError, etree.ParserError) as e:
+            print(f"Could not pre-select {page_type} containers, parsing the whole page: {e}")
+    return BeautifulSoup(html, parser)
+
+
+def parse_page(html, page_type=None, parser=None):
+    """
+    Parse html into a BeautifulSoup tree for the page_type extractor.
+    With lxml installed, only the containers that extractor reads (PAGE_CONTAINERS) are parsed into the tree;
+    without it, or for unknown page types, the whole page is parsed.
+    """
+    start = time.perf_counter()
+    soup = _parse(html, page_type, parser or HTML_PARSER)
+    parse_stats.record(page_type, time.perf_counter() - start)
+    return soup
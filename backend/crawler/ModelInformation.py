@@ -1,57 +1,70 @@
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
-from webdriver_manager.chrome import ChromeDriverManager
-import html2text
-import time
-from bs4 import BeautifulSoup
-from urllib.parse import urlparse
-import threading
-
-from .models.PartInfoModel import PartInfoModel
-
-from urllib.parse import urljoin, quote
+from urllib.parse import urljoin
+import os
 
 from .models.ModelInfoModel import ModelInfoModel
 from .models.ModelInfoModel import Manual
 from .models.ModelInfoModel import Diagram
 from .models.ModelInfoModel import Video
+from .Fetcher import get_fetcher
+from .Pagination import iter_listing_pages
+
+# Videos pages read per model, unset reads them all
+MODEL_VIDEO_MAX_PAGES = int(os.getenv("MODEL_VIDEO_MAX_PAGES", "0")) or None
 
 def url_join(base, path):
     return urljoin(base, path)
 
 class ModelInformation:
-    def __init__(self, url):
-        # Chrome Setup
-        chrome_options = Options()
-        chrome_options.add_argument("--headless=new")  # Enable headless mode
-        chrome_options.add_argument("--disable-gpu")
-        chrome_options.add_argument("--no-sandbox")
-        chrome_options.add_argument("--disable-dev-shm-usage")
-        chrome_options.add_argument("--disable-blink-features=AutomationControlled")
-        chrome_options.add_argument("user-agent=Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/89.0.4389.82 Safari/537.36")
-        chrome_options.add_argument("window-size=1920,1080")
-        chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
-        chrome_options.add_experimental_option("useAutomationExtension", False)
-        self.service = Service(ChromeDriverManager().install())
-        self.driver = webdriver.Chrome(service=self.service, options=chrome_options)
+    def __init__(self, url, max_video_pages=None):
         self.url = url
+        self.max_video_pages = max_video_pages or MODEL_VIDEO_MAX_PAGES
 
         # Initialize placeholders for results
         self.modelInfo = None
+        self.fetcher = get_fetcher()
         self.fetch_model_info()
-        self.driver.quit()
 
 
     def fetch_model_info(self):
         """
-        Fetch model information using Selenium and BeautifulSoup.
+        Fetch model information over HTTP (Selenium as fallback) and parse it with BeautifulSoup.
+        The model page and the first Videos page are fetched together, the remaining Videos pages
+        (up to max_video_pages) concurrently once the first one tells how many there are.
         """
-        self.driver.get(self.url)
-        time.sleep(2)  # Allow the page to load
-        html = self.driver.page_source
-        soup = BeautifulSoup(html, "html.parser")
+        videos_url = url_join(self.url, 'Videos/')
+        pages = self.fetcher.fetch_many({
+            "model": (self.url, "model"),
+            "videos": (videos_url, "model_videos"),
+        })
+        if "model" in pages.errors:
+            raise pages.errors["model"]
+        soup = pages.results["model"].soup
+        model_info = self.parseModelInfo(soup, self.url)
+
+        # Extract videos, page by page as they come in
+        videos = model_info["videos"]
+        if "videos" in pages.results:
+            for videos_soup in iter_listing_pages(
+                videos_url,
+                "model_videos",
+                first=pages.results["videos"],
+                max_pages=self.max_video_pages,
+                fetcher=self.fetcher,
+            ):
+                videos.extend(self.parseVideos(videos_soup))
+        else:
+            # No Videos listing, keep the videos shown on the model page
+            videos.extend(self.parseVideos(soup))
+
+        print(f"Retrieved information for model: {model_info['model_name']} ({len(videos)} videos)")
+        self.modelInfo = model_info
 
+    @staticmethod
+    def parseModelInfo(soup, model_url):
+        """
+        Extract the model name, manuals and diagrams from a parsed model page.
+        Videos are filled in by fetch_model_info.
+        """
         # Extract model name
         model_name = soup.find('h1', {'class': 'title-main'})
         model_name = model_name.text.strip() if model_name else "Model name not found"
@@ -83,49 +96,40 @@ class ModelInformation:
                 if url:
                     diagrams.append({
                         "title": title,
-                        "url": url_join(self.url, url)
+                        "url": url_join(model_url, url)
                     })
 
-        # Extract videos
-        videos = []
-        videos_url = url_join(self.url, 'Videos/')
-        while videos_url:
-            videos_response = self.driver.page_source
-            videos_soup = BeautifulSoup(videos_response, 'html.parser')
-            video_items = videos_soup.find_all('div', class_='yt-video')
-            for item in video_items:
-                title = item.find('img')
-                title = title['title'] if title and 'title' in title.attrs else "Unknown title"
-                video_id = item.get('data-yt-init')
-                if video_id:
-                    videos.append({
-                        "title": title,
-                        "url": f"https://www.youtube.com/watch?v={video_id}"
-                    })
-
-            next_page = videos_soup.find('li', class_='next')
-            next_link = next_page.find('a') if next_page else None
-            if next_link and 'href' in next_link.attrs:
-                videos_url = url_join(videos_url.split('?')[0], next_link['href'])
-            else:
-                videos_url = None
-
         # Extract parts URL
-        parts_url = url_join(self.url, 'Parts/')
+        parts_url = url_join(model_url, 'Parts/')
 
         # Compile model information
-        model_info = {
+        return {
             "type": "model",
             "model_name": model_name,
-            "model_url": self.url,
+            "model_url": model_url,
             "manuals": manuals,
             "diagrams": diagrams,
-            "videos": videos,
+            "videos": [],
             "parts_url": parts_url
         }
 
-        print(f"Retrieved information for model: {model_name}")
-        self.modelInfo = model_info
+    @staticmethod
+    def parseVideos(soup):
+        """
+        Extract the videos listed on a parsed model or model Videos page.
+        """
+        videos = []
+        video_items = soup.find_all('div', class_='yt-video')
+        for item in video_items:
+            title = item.find('img')
+            title = title['title'] if title and 'title' in title.attrs else "Unknown title"
+            video_id = item.get('data-yt-init')
+            if video_id:
+                videos.append({
+                    "title": title,
+                    "url": f"https://www.youtube.com/watch?v={video_id}"
+                })
+        return videos
     
     def getmodelInfoModel(self):
         return ModelInfoModel(
@@ -0,0 +1,33 @@
+import re
+
+from .SiteUrls import PARTSELECT_BASE_URL
+from .Pagination import iter_listing_pages
+
+
+def extractPartLinks(soup):
+    """
+    Return the parts listed on a model Parts page as dicts with part_number and product_link.
+    """
+    parts = []
+    for part_div in soup.find_all("div", class_="mega-m__part"):
+        link = part_div.find("a", class_="mega-m__part__img")
+        href = link.get("href") if link else None
+        match = re.search(r"/PS(\d+)", href) if href else None
+        if match:
+            parts.append({
+                "part_number": f"PS{match.group(1)}",
+                "product_link": f"{PARTSELECT_BASE_URL}{href}"
+            })
+    return parts
+
+
+def getModelParts(model, max_pages=None):
+    """
+    Crawl every page of a model's Parts listing (or the first max_pages of them).
+    Returns the listed parts as dicts with part_number and product_link.
+    """
+    url = f"{PARTSELECT_BASE_URL}/Models/{model}/Parts/"
+    parts = []
+    for soup in iter_listing_pages(url, "model_parts", max_pages=max_pages):
+        parts.extend(extractPartLinks(soup))
+    return parts
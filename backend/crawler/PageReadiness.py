@@ -0,0 +1,120 @@
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.common.by import By
+from selenium.common.exceptions import TimeoutException
+from dataclasses import dataclass, field
+import threading
+import time
+import os
+
+# The fixed wait every page load used to pay before its HTML was read
+LEGACY_SLEEP_SECONDS = 2.0
+
+DEFAULT_READY_TIMEOUT = float(os.getenv("PAGE_READY_TIMEOUT", "10"))
+
+
+@dataclass
+class PageReadiness:
+    """
+    What a parser needs from a page before its HTML can be read.
+    selectors are the CSS selectors the parser extracts from.
+    required is False for pages that can legitimately contain none of them (e.g. a part without Q&A),
+    in which case only the document itself has to be loaded.
+    """
+    selectors: list = field(default_factory=list)
+    required: bool = True
+    timeout: float = DEFAULT_READY_TIMEOUT
+
+
+# Readiness registry keyed by page type
+PAGE_READINESS = {
+    "document": PageReadiness(required=False),
+    "part": PageReadiness([".pd__description"]),
+    "repair_stories": PageReadiness(["div.repair-story"], required=False),
+    "questions_and_answers": PageReadiness(["div.qna__question"], required=False),
+    "model": PageReadiness(["h1.title-main"]),
+    "model_parts": PageReadiness(["h1.title-main"]),
+    "model_videos": PageReadiness(["h1.title-main"]),
+    "repair": PageReadiness(["div.symptom-list"]),
+    # The video thumbnail is optional (not every symptom has a video) and its b-loaded class is only added by the
+    # lazy-load script, so only the solutions list is waited for
+    "symptom": PageReadiness(["div.symptom-list"]),
+}
+
+
+def required_selectors(page_type):
+    """
+    The selectors a fetched page of page_type must contain to be parsed without a browser.
+    """
+    readiness = PAGE_READINESS[page_type]
+    return readiness.selectors if readiness.required else []
+
+
+class ReadinessStats:
+    def __init__(self):
+        """
+        Records how long each page type actually took to become ready.
+        """
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def record(self, page_type, elapsed, timed_out):
+        with self._lock:
+            stats = self._stats.setdefault(page_type, {"pages": 0, "wait_seconds": 0.0, "timeouts": 0})
+            stats["pages"] += 1
+            stats["wait_seconds"] += elapsed
+            stats["timeouts"] += int(timed_out)
+
+    def summary(self):
+        """
+        Per page type: pages loaded, average readiness wait and the sleep time saved
+        compared to the fixed LEGACY_SLEEP_SECONDS.
+        """
+        with self._lock:
+            summary = {}
+            for page_type, stats in self._stats.items():
+                legacy = stats["pages"] * LEGACY_SLEEP_SECONDS
+                summary[page_type] = {
+                    "pages": stats["pages"],
+                    "timeouts": stats["timeouts"],
+                    "avg_wait_seconds": round(stats["wait_seconds"] / stats["pages"], 3),
+                    "sleep_saved_seconds": round(legacy - stats["wait_seconds"], 3),
+                }
+            return summary
+
+
+readiness_stats = ReadinessStats()
+
+
+def _is_ready(driver, readiness):
+    if driver.execute_script("return document.readyState") == "loading":
+        return False
+    if not readiness.required:
+        return True
+    return all(driver.find_elements(By.CSS_SELECTOR, selector) for selector in readiness.selectors)
+
+
+def wait_until_ready(driver, page_type):
+    """
+    Block until the current page of driver has everything the page_type parser needs.
+    A timeout is logged rather than raised, the parser then works with whatever has loaded.
+    Returns the number of seconds waited.
+    """
+    readiness = PAGE_READINESS[page_type]
+    start = time.perf_counter()
+    timed_out = False
+    try:
+        WebDriverWait(driver, readiness.timeout, poll_frequency=0.1).until(lambda d: _is_ready(d, readiness))
+    except TimeoutException:
+        timed_out = True
+        print(f"Timed out after {readiness.timeout}s waiting for {page_type} page selectors {readiness.selectors}")
+    elapsed = time.perf_counter() - start
+    readiness_stats.record(page_type, elapsed, timed_out)
+    return elapsed
+
+
+def load_page(driver, url, page_type="document"):
+    """
+    Navigate driver to url and wait until it is ready for the page_type parser.
+    """
+    driver.get(url)
+    return wait_until_ready(driver, page_type)
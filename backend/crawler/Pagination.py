@@ -0,0 +1,84 @@
+from urllib.parse import urljoin, urlparse, parse_qs, urlencode
+import os
+
+from .Fetcher import get_fetcher
+
+# Query parameters PartSelect's listings select a page with (comma-separated), e.g. /Models/<model>/Parts/?start=2
+LISTING_PAGE_PARAMS = tuple(param.strip() for param in os.getenv("LISTING_PAGE_PARAMS", "start").split(",") if param.strip())
+
+
+def next_page_url(soup, url):
+    """
+    The URL the listing's li.next link points to, or None on the last page.
+    """
+    next_page = soup.find('li', class_='next')
+    next_link = next_page.find('a') if next_page else None
+    if next_link and 'href' in next_link.attrs:
+        return urljoin(url.split('?')[0], next_link['href'])
+    return None
+
+
+def page_count(soup, url, params=LISTING_PAGE_PARAMS):
+    """
+    Read the number of pages and the query parameter selecting a page (one of params, LISTING_PAGE_PARAMS)
+    from the pagination links of a listing's first page. Returns (count, param), or None when the links
+    use none of params (the listing then has to be followed page by page).
+    """
+    next_page = soup.find('li', class_='next')
+    pagination = next_page.find_parent('ul') if next_page else None
+    if pagination is None:
+        return None
+    pages = {}
+    for link in pagination.find_all('a', href=True):
+        query = parse_qs(urlparse(urljoin(url, link['href'])).query)
+        for param in params:
+            values = query.get(param)
+            if values and values[-1].isdigit():
+                pages[param] = max(pages.get(param, 1), int(values[-1]))
+    for param in params:
+        if param in pages:
+            return pages[param], param
+    return None
+
+
+def page_url(url, param, page):
+    parsed = urlparse(url)
+    query = {name: values[-1] for name, values in parse_qs(parsed.query).items()}
+    query[param] = str(page)
+    return parsed._replace(query=urlencode(query)).geturl()
+
+
+def iter_listing_pages(url, page_type, first=None, max_pages=None, fetcher=None):
+    """
+    Yield the parsed pages of a paginated listing in page order, starting with url.
+    first is the FetchResult of url when the caller already has it. Whenever a page's pagination
+    links show pages further ahead, all of them are fetched concurrently and each one is yielded
+    as soon as it (and every page before it) is in. Otherwise li.next links are followed.
+    At most max_pages pages are read when it is set.
+    """
+    fetcher = fetcher or get_fetcher()
+    current = first or fetcher.fetch(url, page_type)
+    yield current.soup
+
+    read = 1
+    while not max_pages or read < max_pages:
+        pages = page_count(current.soup, current.url)
+        if pages is not None and pages[0] > read:
+            count, param = pages
+            if max_pages:
+                count = min(count, max_pages)
+            requests = {page: (page_url(current.url, param, page), page_type) for page in range(read + 1, count + 1)}
+            for page, result, error, elapsed in fetcher.fetch_iter(requests):
+                if error is not None:
+                    raise error
+                yield result.soup
+                current = result
+            read = count
+            continue
+
+        next_url = next_page_url(current.soup, current.url)
+        if not next_url or next_url == current.url:
+            break
+        current = fetcher.fetch(next_url, page_type)
+        yield current.soup
+        read += 1
@@ -0,0 +1,6 @@
+def normalize_key(*numbers):
+    """
+    Key for one or more part/model numbers: trimmed, upper-cased and joined with "|".
+    Shared by the crawl cache, the catalog and the indexes, and free of crawler dependencies.
+    """
+    return "|".join(str(number).strip().upper() for number in numbers)
@@ -0,0 +1,54 @@
+import asyncio
+
+
+class SingleFlight:
+    def __init__(self):
+        """
+        Coalesces concurrent calls with the same key into one in-flight task.
+        Every caller waiting on a key gets the same result or the same exception.
+        """
+        self._inflight = {}
+        self._waiters = {}
+        self.stats = {"calls": 0, "executions": 0, "coalesced": 0, "errors": 0, "cancelled": 0}
+
+    def _done(self, key, task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+            del self._waiters[key]
+        if task.cancelled():
+            self.stats["cancelled"] += 1
+        elif task.exception() is not None:
+            self.stats["errors"] += 1
+
+    async def do(self, key, fn):
+        """
+        Await fn() for key, or join the call already in flight for key.
+        Cancelling one caller does not cancel the shared call while other callers still wait on it,
+        the call is only cancelled once its last caller is gone. Errors are not remembered:
+        the next call after a failure starts a fresh attempt.
+        """
+        self.stats["calls"] += 1
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            self._waiters[key] = 0
+            task.add_done_callback(lambda t: self._done(key, t))
+            self.stats["executions"] += 1
+        else:
+            self.stats["coalesced"] += 1
+
+        self._waiters[key] += 1
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if self._inflight.get(key) is task and self._waiters[key] == 1:
+                # The last caller is gone, nobody needs the result any more
+                task.cancel()
+            raise
+        finally:
+            if self._inflight.get(key) is task:
+                self._waiters[key] -= 1
+
+    def in_flight(self):
+        return len(self._inflight)
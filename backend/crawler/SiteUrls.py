@@ -0,0 +1,26 @@
+from urllib.parse import urlsplit
+import os
+
+# The PartSelect site, the host of every link handed to the agent
+CANONICAL_BASE_URL = "https://www.partselect.com"
+
+# Root of every PartSelect URL the crawlers build. Point it at a local server to replay saved pages.
+PARTSELECT_BASE_URL = os.getenv("PARTSELECT_BASE_URL", CANONICAL_BASE_URL).rstrip("/")
+
+
+def site_path(url):
+    """
+    The path (and query) of a PartSelect URL, whichever host it was crawled from. Links stored in an index keep
+    only this, so an index built against a replay server still links to PartSelect.
+    """
+    if not url:
+        return None
+    parts = urlsplit(url)
+    return f"{parts.path}?{parts.query}" if parts.query else parts.path
+
+
+def canonical_url(path):
+    """
+    The PartSelect URL of a site path.
+    """
+    return f"{CANONICAL_BASE_URL}{path}"
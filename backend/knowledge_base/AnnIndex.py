@@ -0,0 +1,153 @@
+import faiss
+import numpy as np
+import math
+import os
+
+# Index types FaissIndexer can build, all searched by inner product of unit vectors (cosine similarity)
+INDEX_TYPES = ("flat", "hnsw", "ivf_flat", "ivf_pq")
+
+# Build parameters per index type. nlist 0 picks 4 * sqrt(number of vectors).
+# ef_search and nprobe are search-time knobs: saved with the index and overridable with FAISS_EF_SEARCH / FAISS_NPROBE.
+DEFAULT_PARAMS = {
+    "flat": {},
+    "hnsw": {"M": 32, "ef_construction": 80, "ef_search": 64},
+    "ivf_flat": {"nlist": 0, "nprobe": 8},
+    "ivf_pq": {"nlist": 0, "nprobe": 8, "pq_m": 48, "pq_nbits": 8},
+}
+
+# k-means wants at least this many training vectors per centroid
+TRAINING_POINTS_PER_CENTROID = 39
+
+
+def index_params(index_type, params=None, size=None):
+    """
+    Build parameters for index_type: the defaults overridden by params, with nlist chosen for size vectors
+    and capped so that size vectors are enough to train it.
+    """
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown index type {index_type}, expected one of {INDEX_TYPES}")
+    resolved = {**DEFAULT_PARAMS[index_type], **(params or {})}
+    if "nlist" in resolved and size:
+        nlist = resolved["nlist"] or int(4 * math.sqrt(size))
+        resolved["nlist"] = max(1, min(nlist, size // TRAINING_POINTS_PER_CENTROID))
+    if "pq_nbits" in resolved and size:
+        # Each sub-quantizer has 2**nbits centroids to train as well
+        resolved["pq_nbits"] = max(1, min(resolved["pq_nbits"], int(math.log2(max(2, size // TRAINING_POINTS_PER_CENTROID)))))
+    return resolved
+
+
+def build_index(dimension, index_type="flat", params=None):
+    """
+    An empty index of index_type for vectors of dimension, taking vector ids with add_with_ids.
+    Flat and HNSW indexes are wrapped in an IndexIDMap2, IVF indexes store the ids themselves
+    (with a hash table so vectors can be reconstructed and removed by id).
+    """
+    params = index_params(index_type, params)
+    if index_type == "flat":
+        return faiss.IndexIDMap2(faiss.IndexFlatIP(dimension))
+    if index_type == "hnsw":
+        index = faiss.IndexHNSWFlat(dimension, params["M"], faiss.METRIC_INNER_PRODUCT)
+        index.hnsw.efConstruction = params["ef_construction"]
+        index.hnsw.efSearch = params["ef_search"]
+        return faiss.IndexIDMap2(index)
+    quantizer = faiss.IndexFlatIP(dimension)
+    if index_type == "ivf_flat":
+        index = faiss.IndexIVFFlat(quantizer, dimension, params["nlist"], faiss.METRIC_INNER_PRODUCT)
+    else:
+        if dimension % params["pq_m"]:
+            raise ValueError(f"pq_m ({params['pq_m']}) must divide the embedding dimension ({dimension})")
+        index = faiss.IndexIVFPQ(quantizer, dimension, params["nlist"], params["pq_m"], params["pq_nbits"], faiss.METRIC_INNER_PRODUCT)
+    index.nprobe = params["nprobe"]
+    index.set_direct_map_type(faiss.DirectMap.Hashtable)
+    return index
+
+
+def _ivf(index):
+    return faiss.downcast_index(faiss.extract_index_ivf(index))
+
+
+def training_size(index):
+    """
+    Number of vectors to collect before training index (0 when it needs no training).
+    """
+    if index.is_trained:
+        return 0
+    ivf = _ivf(index)
+    size = ivf.nlist * TRAINING_POINTS_PER_CENTROID
+    if isinstance(ivf, faiss.IndexIVFPQ):
+        size = max(size, (1 << ivf.pq.nbits) * TRAINING_POINTS_PER_CENTROID)
+    return size
+
+
+def index_type(index):
+    """
+    The INDEX_TYPES name of a built or loaded index.
+    """
+    inner = faiss.downcast_index(index.index) if isinstance(index, faiss.IndexIDMap) else index
+    if isinstance(inner, faiss.IndexHNSW):
+        return "hnsw"
+    if isinstance(inner, faiss.IndexIVFPQ):
+        return "ivf_pq"
+    if isinstance(inner, faiss.IndexIVF):
+        return "ivf_flat"
+    return "flat"
+
+
+def index_config(index):
+    """
+    Type and parameters of index, as saved in its file.
+    """
+    kind = index_type(index)
+    config = {"type": kind, "vectors": index.ntotal}
+    if kind == "hnsw":
+        hnsw = faiss.downcast_index(index.index).hnsw
+        config.update({"M": hnsw.nb_neighbors(1), "ef_construction": hnsw.efConstruction, "ef_search": hnsw.efSearch})
+    elif kind != "flat":
+        ivf = _ivf(index)
+        config.update({"nlist": ivf.nlist, "nprobe": ivf.nprobe})
+        if kind == "ivf_pq":
+            config.update({"pq_m": ivf.pq.M, "pq_nbits": ivf.pq.nbits})
+    return config
+
+
+def search_parameters(index, selector=None):
+    """
+    Search parameters for index: its saved ef_search / nprobe unless FAISS_EF_SEARCH / FAISS_NPROBE are set,
+    restricted to selector's ids when given. None for a flat index without selector.
+    """
+    kind = index_type(index)
+    if kind == "hnsw":
+        ef_search = int(os.getenv("FAISS_EF_SEARCH", "0")) or faiss.downcast_index(index.index).hnsw.efSearch
+        return faiss.SearchParametersHNSW(sel=selector, efSearch=ef_search)
+    if kind != "flat":
+        nprobe = int(os.getenv("FAISS_NPROBE", "0")) or _ivf(index).nprobe
+        return faiss.SearchParametersIVF(sel=selector, nprobe=nprobe)
+    return faiss.SearchParameters(sel=selector) if selector is not None else None
+
+
+def remove_ids(index, ids):
+    """
+    Remove the vectors with ids from index and return the index, a rebuilt one for HNSW graphs
+    which cannot drop vectors (the remaining vectors are copied, not embedded again).
+    """
+    ids = np.asarray(ids, dtype="int64")
+    if len(ids) == 0:
+        return index
+    kind = index_type(index)
+    if kind in ("ivf_flat", "ivf_pq"):
+        # The id hash table only supports removing an explicit id array
+        index.remove_ids(faiss.IDSelectorArray(len(ids), faiss.swig_ptr(ids)))
+        return index
+    if kind == "flat":
+        index.remove_ids(ids)
+        return index
+    keep = np.setdiff1d(faiss.vector_to_array(index.id_map), ids)
+    vectors = np.vstack([index.reconstruct(int(idx)) for idx in keep]) if len(keep) else None
+    hnsw = faiss.downcast_index(index.index).hnsw
+    rebuilt = build_index(index.d, "hnsw", {
+        "M": hnsw.nb_neighbors(1), "ef_construction": hnsw.efConstruction, "ef_search": hnsw.efSearch,
+    })
+    if vectors is not None:
+        rebuilt.add_with_ids(vectors, keep)
+    return rebuilt
+
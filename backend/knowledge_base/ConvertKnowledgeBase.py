@@ -0,0 +1,43 @@
+import os
+import sys
+# Make the backend packages (crawler, knowledge_base) importable when run as a script
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+
+from knowledge_base.FaissIndexer import FaissIndexer
+
+def convert_knowledge_base(index_path, metadata_path, output_metadata_path=None):
+    """
+    Rewrite a FAISS index / pickled metadata pair in the memory-mapped, normalized format load_index reads.
+    The index file itself is already memory-mappable and is rewritten in place, the metadata
+    goes to output_metadata_path (the .pkl path with a .meta extension by default).
+    """
+    output_metadata_path = output_metadata_path or os.path.splitext(metadata_path)[0] + ".meta"
+    indexer = FaissIndexer(data_list=None)
+    indexer.load_index(index_path, metadata_path, mmap=False)
+    indexer.save_index(index_path, output_metadata_path)
+
+    # Check the converted metadata decodes to the same entries
+    converted = FaissIndexer(data_list=None)
+    converted.load_index(index_path, output_metadata_path)
+    if (
+        list(converted.metadata) != indexer.metadata
+        or list(converted.symptoms) != indexer.symptoms
+        or converted.index.ntotal != indexer.index.ntotal
+    ):
+        raise ValueError(f"Converted metadata {output_metadata_path} does not match {metadata_path}")
+    print(
+        f"Converted {len(indexer.metadata)} entries: {metadata_path} ({os.path.getsize(metadata_path)} bytes) -> "
+        f"{output_metadata_path} ({os.path.getsize(output_metadata_path)} bytes)"
+    )
+    return output_metadata_path
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert .bin/.pkl knowledge base pairs to the memory-mapped format.")
+    parser.add_argument("pairs", nargs="+", help="index_path metadata_path [index_path metadata_path ...]")
+    args = parser.parse_args()
+    if len(args.pairs) % 2:
+        parser.error("Expected index/metadata path pairs")
+    for index_path, metadata_path in zip(args.pairs[::2], args.pairs[1::2]):
+        convert_knowledge_base(index_path, metadata_path)
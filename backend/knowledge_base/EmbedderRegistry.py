@@ -0,0 +1,169 @@
+import threading
+import time
+import os
+
+# Embedding backends: the PyTorch model, or its int8-quantized ONNX export run by onnxruntime
+BACKENDS = ("torch", "onnx")
+
+# Quantized graph published with the sentence-transformers models (uint8 weights, AVX2 kernels)
+DEFAULT_ONNX_FILE = "onnx/model_quint8_avx2.onnx"
+
+
+def model_memory_bytes(model):
+    """
+    Memory held by the model's parameters and buffers. The ONNX backend's weights live in the onnxruntime
+    session rather than in tensors, so for it the registry measures the load with resident_bytes() instead.
+    """
+    tensors = list(model.parameters()) + list(model.buffers())
+    return sum(tensor.numel() * tensor.element_size() for tensor in tensors)
+
+
+def resident_bytes():
+    """
+    Resident set size of this process (Linux only, None elsewhere).
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return None
+
+
+class EmbedderRegistry:
+    def __init__(self, backend=None, onnx_file=None, threads=None):
+        """
+        Loads each SentenceTransformer model once, on first use, and hands the same instance to every
+        FaissIndexer using it. Indexes register with attach() when they are created, so the registry
+        knows how many copies sharing saves.
+        backend is "torch" or "onnx" (EMBEDDER_BACKEND), onnx_file the quantized graph in the model repository
+        or a local path (EMBEDDER_ONNX_FILE), threads the number of CPU threads used per encode (EMBEDDER_THREADS,
+        0 keeps the runtime default).
+        """
+        self.backend = backend or os.getenv("EMBEDDER_BACKEND", "torch")
+        if self.backend not in BACKENDS:
+            raise ValueError(f"Unknown embedder backend {self.backend}, expected one of {BACKENDS}")
+        self.onnx_file = onnx_file or os.getenv("EMBEDDER_ONNX_FILE", DEFAULT_ONNX_FILE)
+        self.threads = threads if threads is not None else int(os.getenv("EMBEDDER_THREADS", "0"))
+        self._models = {}
+        self._model_locks = {}
+        self._sizes = {}
+        self._users = {}
+        self._lock = threading.Lock()
+        self.stats = {"loads": 0, "load_seconds": 0.0}
+
+    def attach(self, model_name):
+        """
+        Record one more index using model_name. The model itself is not loaded until get().
+        """
+        with self._lock:
+            self._users[model_name] = self._users.get(model_name, 0) + 1
+
+    def get(self, model_name):
+        """
+        Return the shared model, loading it if this is the first use in the process.
+        Concurrent first calls for the same model wait for a single load.
+        """
+        model = self._models.get(model_name)
+        if model is not None:
+            return model
+        with self._lock:
+            model_lock = self._model_locks.setdefault(model_name, threading.Lock())
+        with model_lock:
+            model = self._models.get(model_name)
+            if model is None:
+                model = self._load(model_name)
+        return model
+
+    def _load(self, model_name):
+        # Imported here so that loading or merging an index does not import torch
+        from sentence_transformers import SentenceTransformer
+
+        start = time.perf_counter()
+        if self.backend == "onnx":
+            # The session's memory is the process growth over the load, which also counts the tokenizer and
+            # onnxruntime's arenas, and anything another thread allocates meanwhile (0 without /proc)
+            rss_before = resident_bytes()
+            model = SentenceTransformer(model_name, backend="onnx", model_kwargs=self._onnx_kwargs())
+            rss_after = resident_bytes()
+            size = max(rss_after - rss_before, 0) if rss_before is not None and rss_after is not None else 0
+        else:
+            if self.threads:
+                import torch
+                torch.set_num_threads(self.threads)
+            model = SentenceTransformer(model_name)
+            size = model_memory_bytes(model)
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self._models[model_name] = model
+            self._sizes[model_name] = size
+            self.stats["loads"] += 1
+            self.stats["load_seconds"] += elapsed
+            users = self._users.get(model_name, 0)
+        size = size / 2**20
+        print(
+            f"Embedding model {model_name} ({self.backend}) loaded in {elapsed:.1f}s ({size:.0f}MB), shared by {users} indexes, "
+            f"saving {size * max(users - 1, 0):.0f}MB"
+        )
+        return model
+
+    def _onnx_kwargs(self):
+        import onnxruntime
+
+        session_options = onnxruntime.SessionOptions()
+        if self.threads:
+            session_options.intra_op_num_threads = self.threads
+            session_options.inter_op_num_threads = 1
+        return {"file_name": self.onnx_file, "provider": "CPUExecutionProvider", "session_options": session_options}
+
+    def use_backend(self, backend):
+        """
+        Switch to backend, dropping the loaded models so that they are loaded again with it on next use.
+        Cached query embeddings are keyed by backend, so the previous backend's are not served for it.
+        """
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown embedder backend {backend}, expected one of {BACKENDS}")
+        with self._lock:
+            self.backend = backend
+            self._models = {}
+            self._model_locks = {}
+            self._sizes = {}
+
+    def warm_up(self, model_names=None):
+        """
+        Load model_names (by default every model an index is attached to) now instead of on the first query.
+        """
+        for model_name in model_names or list(self._users):
+            self.get(model_name)
+
+    def memory_report(self):
+        """
+        Per model: indexes sharing it, whether it is loaded, its size (parameter and buffer bytes with torch,
+        resident memory added by the load with onnx) and the memory saved compared to one copy per index.
+        """
+        with self._lock:
+            report = {}
+            for model_name, users in self._users.items():
+                size = self._sizes.get(model_name, 0)
+                report[model_name] = {
+                    "backend": self.backend,
+                    "indexes": users,
+                    "loaded": model_name in self._models,
+                    "bytes": size,
+                    "saved_bytes": size * max(users - 1, 0),
+                }
+            return report
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_embedder_registry():
+    """
+    Return the process-wide embedder registry, creating it on first use.
+    """
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = EmbedderRegistry()
+        return _registry
@@ -2,86 +2,644 @@ import os
 os.environ["TOKENIZERS_PARALLELISM"] = "false" 
 import faiss
 import numpy as np
-from sentence_transformers import SentenceTransformer
 from sklearn.preprocessing import normalize
+import threading
+import hashlib
 import pickle
+import time
+
+from knowledge_base.EmbedderRegistry import get_embedder_registry
+from knowledge_base.QueryEmbeddingCache import get_query_embedding_cache
+from knowledge_base.MetadataFile import MetadataFile, write_metadata
+from knowledge_base.LexicalIndex import LexicalIndex, lexical_index_path
+from knowledge_base.RetrievalPayloads import build_payload, serialize_payload, absolute_links, assemble_payloads
+from knowledge_base.AnnIndex import build_index, index_params, training_size, search_parameters, remove_ids, index_config
+
+# Reciprocal rank fusion constant: how much the top ranks of each retriever dominate the fused order
+RRF_K = 60
+
+def normalize_metadata(metadata):
+    """
+    Split metadata in the original layout, where every solution entry carries its whole parent symptom,
+    into vector records that refer to symptoms by id and the list of those symptoms.
+    """
+    symptoms = []
+    symptom_ids = {}
+    records = []
+    for entry in metadata:
+        symptom = entry["data"] if entry["type"] == "title" else entry["parent"]
+        key = (entry.get("appliance"), symptom.get("href") or symptom["title"])
+        if key not in symptom_ids:
+            symptom_ids[key] = len(symptoms)
+            symptoms.append(symptom)
+        record = {"type": entry["type"], "appliance": entry.get("appliance"), "symptom": symptom_ids[key]}
+        if entry["type"] == "solution":
+            record["solution"] = symptoms[symptom_ids[key]]["solutions"].index(entry["data"])
+        records.append(record)
+    return records, symptoms
+
+def record_text(symptom, record):
+    """
+    The text embedded for a metadata record.
+    """
+    if record["type"] == "title":
+        return f"{symptom['title']} - {symptom['description']}"
+    solution = symptom["solutions"][record["solution"]]
+    return f"{symptom['title']} - {solution['part']} - {solution['description']}"
+
+def record_name(symptom, record):
+    """
+    The symptom title of a title record, the part name of a solution record.
+    """
+    if record["type"] == "title":
+        return symptom["title"]
+    return symptom["solutions"][record["solution"]]["part"]
+
+def content_hash(text):
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+def describe_record(vector_id, symptom, record, text):
+    """
+    Manifest entry for a vector: enough to tell which symptom or solution it is without the index.
+    """
+    entry = {
+        "id": int(vector_id),
+        "appliance": record["appliance"],
+        "type": record["type"],
+        "symptom": symptom["title"],
+        "hash": content_hash(text),
+    }
+    if record["type"] == "solution":
+        entry["part"] = symptom["solutions"][record["solution"]]["part"]
+    return entry
 
 class FaissIndexer:
-    def __init__(self, data_list, model_name="all-MiniLM-L6-v2"):
+    # Record fields kept as tag columns of the metadata file, that searches can be restricted to
+    TAGS = ("appliance", "type")
+    # Metadata table of the items (symptoms) records refer to, and the record field holding an item's position in it
+    ITEMS_TABLE = "symptoms"
+    ITEM_KEY = "symptom"
+    # Payload fields shortened when a hit's payload is over its share of the token budget
+    PAYLOAD_TEXT_FIELDS = ("description",)
+
+    def __init__(self, data_list, model_name="all-MiniLM-L6-v2", index_type=None, index_params=None):
         """
-        data_list is the list of troubleshoot info dicts, e.g. dishwasherTroubleshoot or refrigeratorTroubleshoot
+        data_list is the list of troubleshoot info dicts, e.g. dishwasherTroubleshoot or refrigeratorTroubleshoot,
+        or a dict mapping appliance names to such lists to index several appliances together.
         model_name is the name of the SentenceTransformer model to use for embeddings.
+        The model is shared with every other index using it and only loaded on first use.
+        index_type is the kind of index built by create_index/update ("flat", "hnsw", "ivf_flat" or "ivf_pq",
+        FAISS_INDEX_TYPE by default) and index_params overrides its build parameters (see AnnIndex.DEFAULT_PARAMS).
+        Loaded indexes keep the type and parameters they were saved with.
         """
         self.data_list = data_list
+        self.index_type = index_type or os.getenv("FAISS_INDEX_TYPE", "flat")
+        self.index_params = index_params
         self.index = None
-        self.embeddings = []
+        # Vectors waiting for the index to be trained
+        self._untrained = []
+        # One record per vector referring to its symptom (and solution) by position in self.items
         self.metadata = []
-        self.model = SentenceTransformer(model_name)
+        self.items = []
+        # Serialized payload per vector for the troubleshooting tool, stored in the metadata file by save_index
+        self.payloads = None
+        self.model_name = model_name
+        self._selectors = {}
+        self._mapped = False
+        # BM25 index over the same texts, answering queries that name a symptom or part without the model
+        self.lexical = None
+        self.lexical_shortcut = os.getenv("LEXICAL_SHORTCUT", "true").lower() == "true"
+        self.search_stats = {"queries": 0, "lexical": 0, "hybrid": 0, "dense": 0, "lexical_seconds": 0.0, "model_seconds": 0.0}
+        self._stats_lock = threading.Lock()
+        get_embedder_registry().attach(model_name)
+
+    @property
+    def model(self):
+        return get_embedder_registry().get(self.model_name)
+
+    @property
+    def symptoms(self):
+        return self.items
+
+    @symptoms.setter
+    def symptoms(self, symptoms):
+        self.items = symptoms
+
+    # What a vector's text, name, manifest entry, position and tool payload are, from its record and the item it refers to.
+    # Subclasses indexing other items override these along with collect_texts and resolve.
+
+    def record_item(self, record, items=None):
+        return (self.items if items is None else items)[record[self.ITEM_KEY]]
+
+    def item_text(self, item, record):
+        return record_text(item, record)
+
+    def item_name(self, item, record):
+        return record_name(item, record)
+
+    def describe(self, vector_id, item, record, text):
+        return describe_record(vector_id, item, record, text)
+
+    def item_slot(self, item, record):
+        # Where an entry sits on the repair pages, to tell a changed entry from an added one
+        return (record["appliance"], item.get("href") or item["title"], record["type"], record.get("solution"))
+
+    def item_payload(self, item, record):
+        return build_payload(item, record)
         
-    def create_index(self):
-        # Process the entire data list without batching
-        for item in self.data_list:
-            # Generate embedding for the title and description
-            title_text = f"{item['title']} - {item['description']}"
-            title_embedding = self._get_embedding(title_text)
-            self.embeddings.append(title_embedding)
-            self.metadata.append({"type": "title", "data": item})
-
-            # Generate embeddings for each solution
-            for solution in item.get("solutions", []):
-                solution_text = f"{item['title']} - {solution['part']} - {solution['description']}"
-                solution_embedding = self._get_embedding(solution_text)
-                self.embeddings.append(solution_embedding)
-                self.metadata.append({"type": "solution", "parent": item, "data": solution})
-
-        # Normalize embeddings to unit vectors
-        self.embeddings = normalize(np.array(self.embeddings).astype("float32"), axis=1)
-
-        # Create the FAISS index for cosine similarity (Inner Product)
-        dimensions = self.embeddings.shape[1]
-        self.index = faiss.IndexFlatIP(dimensions)
-        self.index.add(self.embeddings)
-
-    def search(self, query, k=3):
-        # Generate embedding for the query and normalize it
-        query_embedding = self._get_embedding(query)
-        query_embedding = normalize(np.array([query_embedding]).astype("float32"), axis=1)
-
-        # Perform the search
-        distances, indices = self.index.search(query_embedding, k)
-
-        # Convert distances to similarity scores (cosine similarity)
-        results = []
-        for dist, idx in zip(distances[0], indices[0]):
-            results.append({"score": float(dist), "data": self.metadata[idx]})
-        return results
+    def collect_texts(self):
+        """
+        The texts to embed (one per symptom title and one per solution), their metadata records in index order
+        and the symptoms those records refer to.
+        """
+        texts = []
+        metadata = []
+        symptoms = []
+        by_appliance = self.data_list if isinstance(self.data_list, dict) else {None: self.data_list}
+        for appliance, data_list in by_appliance.items():
+            for item in data_list:
+                symptom_id = len(symptoms)
+                symptoms.append(item)
+
+                # Text for the title and description, then one for each solution
+                records = [{"type": "title", "appliance": appliance, "symptom": symptom_id}]
+                records.extend(
+                    {"type": "solution", "appliance": appliance, "symptom": symptom_id, "solution": solution_id}
+                    for solution_id in range(len(item.get("solutions", [])))
+                )
+                for record in records:
+                    texts.append(self.item_text(item, record))
+                    metadata.append(record)
+        return texts, metadata, symptoms
+
+    def _new_index(self, dimension, size):
+        # Cosine similarity (Inner Product of unit vectors), with ids that stay valid when vectors are removed
+        return build_index(dimension, self.index_type, index_params(self.index_type, self.index_params, size))
+
+    def _add(self, embeddings, ids, size):
+        """
+        Add embeddings with ids to the index, creating it for size vectors on first use. Index types that need
+        training (IVF) keep the vectors until enough have been collected, _flush_training adds the rest.
+        """
+        if self.index is None:
+            self.index = self._new_index(embeddings.shape[1], size)
+        if self.index.is_trained:
+            self.index.add_with_ids(embeddings, ids)
+            return
+        self._untrained.append((embeddings, ids))
+        if sum(len(vectors) for vectors, _ in self._untrained) >= min(training_size(self.index), size):
+            self._flush_training()
+
+    def _flush_training(self):
+        if not self._untrained:
+            return
+        vectors = np.vstack([vectors for vectors, _ in self._untrained])
+        ids = np.concatenate([ids for _, ids in self._untrained])
+        self._untrained = []
+        if not self.index.is_trained:
+            start = time.perf_counter()
+            self.index.train(vectors)
+            print(f"Trained the {self.index_type} index on {len(vectors)} vectors in {time.perf_counter() - start:.1f}s")
+        self.index.add_with_ids(vectors, ids)
+
+    def _embed_chunks(self, texts, batch_size=None, chunk_size=None, processes=None):
+        """
+        Yield (position of the chunk in texts, normalized embeddings) chunk_size texts at a time,
+        each chunk encoded in batches of batch_size, on a multi-process pool when processes > 1.
+        Defaults come from EMBED_BATCH_SIZE, EMBED_CHUNK_SIZE and EMBED_PROCESSES.
+        """
+        batch_size = batch_size or int(os.getenv("EMBED_BATCH_SIZE", "64"))
+        chunk_size = chunk_size or int(os.getenv("EMBED_CHUNK_SIZE", "1024"))
+        processes = processes or int(os.getenv("EMBED_PROCESSES", "1"))
+        if not texts:
+            return
+
+        pool = None
+        if processes > 1:
+            pool = self.model.start_multi_process_pool(["cpu"] * processes)
+        try:
+            start = time.perf_counter()
+            for chunk_start in range(0, len(texts), chunk_size):
+                chunk = texts[chunk_start:chunk_start + chunk_size]
+                if pool:
+                    embeddings = self.model.encode_multi_process(chunk, pool, batch_size=batch_size)
+                else:
+                    embeddings = self.model.encode(chunk, batch_size=batch_size, show_progress_bar=False)
+
+                # Normalize embeddings to unit vectors
+                yield chunk_start, normalize(np.asarray(embeddings, dtype="float32"), axis=1)
+
+                done = chunk_start + len(chunk)
+                elapsed = time.perf_counter() - start
+                print(f"Indexed {done}/{len(texts)} texts ({done / elapsed:.0f} texts/s)")
+        finally:
+            if pool:
+                self.model.stop_multi_process_pool(pool)
+
+    def create_index(self, batch_size=None, chunk_size=None, processes=None):
+        """
+        Embed every text in batches of batch_size and add the vectors to the index chunk_size texts at a time.
+        processes > 1 encodes each chunk on a multi-process pool (CPU only machines).
+        Defaults come from EMBED_BATCH_SIZE, EMBED_CHUNK_SIZE and EMBED_PROCESSES.
+        """
+        texts, self.metadata, self.items = self.collect_texts()
+        if not texts:
+            raise ValueError(f"No {self.ITEMS_TABLE} to index")
+
+        self.index = None
+        self._mapped = False
+        for chunk_start, embeddings in self._embed_chunks(texts, batch_size, chunk_size, processes):
+            self._add(embeddings, np.arange(chunk_start, chunk_start + len(embeddings), dtype="int64"), len(texts))
+        self._flush_training()
+        self.lexical = self._build_lexical()
+        self.payloads = None
+        self._selectors = {}
+
+    def update(self, data_list, batch_size=None, chunk_size=None, processes=None):
+        """
+        Bring the index up to date with data_list (same shapes as in __init__) without re-embedding unchanged texts.
+        Every text is hashed: vectors whose tags and text hash are still present keep their id, texts that
+        are new or changed are embedded and added, and vectors of texts no longer present are removed.
+        The index must be loaded with mmap=False (or built in this process) since it is modified in place.
+        Returns the changes: added, changed and removed manifest entries, and the number of unchanged vectors.
+        """
+        if self._mapped:
+            raise ValueError("A memory-mapped index cannot be updated, load it with mmap=False")
+        self.data_list = data_list
+        texts, metadata, items = self.collect_texts()
+        if not texts:
+            raise ValueError(f"No {self.ITEMS_TABLE} to index")
+        self._ensure_id_map()
+
+        def key(record, text):
+            return tuple(record.get(tag) for tag in self.TAGS), content_hash(text)
+
+        # Ids of the current vectors by tags and text hash (a list, as the same text can appear twice)
+        old_items = list(self.items)
+        old_metadata = list(self.metadata)
+        existing = {}
+        for vector_id, record in enumerate(old_metadata):
+            if record is not None:
+                text = self.item_text(self.record_item(record, old_items), record)
+                existing.setdefault(key(record, text), []).append(vector_id)
+
+        ids = [None] * len(texts)
+        pending = []
+        for position, (text, record) in enumerate(zip(texts, metadata)):
+            matches = existing.get(key(record, text))
+            if matches:
+                ids[position] = matches.pop(0)
+            else:
+                pending.append(position)
+        removed_ids = sorted(vector_id for matches in existing.values() for vector_id in matches)
+
+        removed = []
+        removed_slots = set()
+        for vector_id in removed_ids:
+            record = old_metadata[vector_id]
+            item = self.record_item(record, old_items)
+            removed.append(self.describe(vector_id, item, record, self.item_text(item, record)))
+            removed_slots.add(self.item_slot(item, record))
+        if removed_ids and self.index is not None:
+            self.index = remove_ids(self.index, removed_ids)
+
+        # New vectors reuse the ids freed by removed ones before taking new ids at the end
+        free_ids = removed_ids + [vector_id for vector_id, record in enumerate(old_metadata) if record is None]
+        free_ids = sorted(free_ids, reverse=True)
+        next_id = len(old_metadata)
+        for position in pending:
+            if free_ids:
+                ids[position] = free_ids.pop()
+            else:
+                ids[position] = next_id
+                next_id += 1
+
+        pending_texts = [texts[position] for position in pending]
+        for chunk_start, embeddings in self._embed_chunks(pending_texts, batch_size, chunk_size, processes):
+            chunk_ids = [ids[position] for position in pending[chunk_start:chunk_start + len(embeddings)]]
+            self._add(embeddings, np.asarray(chunk_ids, dtype="int64"), len(pending_texts))
+        self._flush_training()
+
+        added = []
+        changed = []
+        for position in pending:
+            record = metadata[position]
+            item = self.record_item(record, items)
+            entry = self.describe(ids[position], item, record, texts[position])
+            (changed if self.item_slot(item, record) in removed_slots else added).append(entry)
+
+        # Metadata is indexed by vector id, ids without a vector are left empty
+        new_metadata = [None] * (max(ids) + 1)
+        for vector_id, record in zip(ids, metadata):
+            new_metadata[vector_id] = record
+        self.metadata = new_metadata
+        self.items = items
+        self.lexical = self._build_lexical()
+        self.payloads = None
+        self._selectors = {}
+        return {"added": added, "changed": changed, "removed": removed, "unchanged": len(texts) - len(pending)}
+
+    def _ensure_id_map(self):
+        """
+        Move the vectors of an index built before vectors had ids (a plain flat index, where the id is the position)
+        into an id-mapped one so that they can be removed without renumbering the others.
+        """
+        if self.index is None or isinstance(self.index, (faiss.IndexIDMap2, faiss.IndexIVF)):
+            return
+        vectors = self.index.reconstruct_n(0, self.index.ntotal)
+        self.index = build_index(vectors.shape[1], "flat")
+        self.index.add_with_ids(vectors, np.arange(len(vectors), dtype="int64"))
+
+    @classmethod
+    def merge(cls, indexers, model_name="all-MiniLM-L6-v2"):
+        """
+        Combine per-appliance flat indexes ({appliance: FaissIndexer}) into one tagged index
+        without re-embedding anything.
+        """
+        merged = cls(data_list=None, model_name=model_name)
+        for appliance, indexer in indexers.items():
+            vectors = indexer.index.reconstruct_n(0, indexer.index.ntotal)
+            if merged.index is None:
+                merged.index = faiss.IndexFlatIP(vectors.shape[1])
+            merged.index.add(vectors)
+            merged.metadata.extend(
+                {**entry, "appliance": appliance, "symptom": entry["symptom"] + len(merged.symptoms)}
+                for entry in indexer.metadata
+            )
+            merged.symptoms.extend(indexer.symptoms)
+        return merged
+
+    def resolve(self, record):
+        """
+        The search result data for a metadata record: the symptom for a title vector,
+        the solution and its symptom (without the other solutions) for a solution vector.
+        """
+        symptom = self.record_item(record)
+        if record["type"] == "title":
+            return {"type": "title", "appliance": record["appliance"], "data": symptom}
+        parent = {key: value for key, value in symptom.items() if key != "solutions"}
+        return {
+            "type": "solution",
+            "appliance": record["appliance"],
+            "parent": parent,
+            "data": symptom["solutions"][record["solution"]],
+        }
+
+    def _build_lexical(self):
+        items = list(self.items)
+        documents = []
+        for vector_id, record in enumerate(self.metadata):
+            if record is not None:
+                item = self.record_item(record, items)
+                documents.append((vector_id, self.item_text(item, record), self.item_name(item, record)))
+        return LexicalIndex.build(documents)
+
+    def _tag_ids(self, tag, value):
+        """
+        Ids of the vectors tagged with value (one of TAGS), from the metadata file's tag column when loaded from disk.
+        """
+        if isinstance(self.metadata, MetadataFile):
+            return self.metadata.tag_ids(tag, value)
+        return np.asarray(
+            [idx for idx, entry in enumerate(self.metadata) if entry and (entry.get(tag) or "").lower() == value.lower()],
+            dtype="int64",
+        )
+
+    def _filter(self, **tags):
+        """
+        Search parameters restricting the search to vectors with the given tag values (e.g. appliance="Dishwasher"),
+        and the ids of those vectors. The parameters also carry the index's ef_search / nprobe.
+        ids is None when there is no filter, and the parameters are False when no vector matches it.
+        """
+        filters = tuple((tag, value.lower()) for tag, value in tags.items() if value)
+        if not filters:
+            return search_parameters(self.index), None
+        if filters not in self._selectors:
+            ids = self._tag_ids(*filters[0])
+            for key in filters[1:]:
+                ids = np.intersect1d(ids, self._tag_ids(*key))
+            if len(ids) == 0:
+                self._selectors[filters] = (False, None, ids)
+            else:
+                # The selector is kept next to the parameters so that it outlives them
+                selector = faiss.IDSelectorBatch(ids)
+                self._selectors[filters] = (search_parameters(self.index, selector), selector, ids)
+        params, _, ids = self._selectors[filters]
+        return params, ids
+
+    def _search_params(self, appliance=None, type=None):
+        """
+        Search parameters restricting the search to vectors tagged with appliance and/or type.
+        None when a flat index is not filtered, False when no vector matches the filter.
+        """
+        return self._filter(appliance=appliance, type=type)[0]
+
+    def search(self, query, k=3, appliance=None, type=None):
+        """
+        Top k hits for query, optionally only among vectors tagged with appliance and/or type ("title", "solution").
+        """
+        return self.search_many([query], k, appliance, type)[0]
+
+    def search_many(self, queries, k=3, appliance=None, type=None):
+        """
+        search() for several queries at once. Returns one result list per query.
+        """
+        return [
+            [{"score": score, "data": self.resolve(self.metadata[idx])} for idx, score in hits]
+            for hits in self._search_ids(queries, k, appliance=appliance, type=type)
+        ]
+
+    def _search_ids(self, queries, k=3, **tags):
+        """
+        Top k (vector id, score) pairs for each query, among the vectors with the given tag values.
+        A query that is exactly a symptom title or part name is answered from the lexical index without running the model,
+        its hits scored 1.0 (see LexicalIndex.confident_hits). The other queries are encoded in one batch (uncached ones),
+        searched with a single index call, and their dense and lexical hits are merged by reciprocal rank fusion,
+        each scored by its cosine similarity to the query.
+        """
+        params, allowed_ids = self._filter(**tags)
+        if params is False:
+            return [[] for _ in queries]
+
+        all_results = [None] * len(queries)
+        lexical_start = time.perf_counter()
+        lexical_hits = {}
+        for position, query in enumerate(queries):
+            if self.lexical is None:
+                break
+            hits = self.lexical.confident_hits(query, k, allowed_ids) if self.lexical_shortcut else None
+            if hits is not None:
+                all_results[position] = hits
+            else:
+                lexical_hits[position] = [idx for idx, _, _ in self.lexical.search(query, k * 4, allowed_ids)]
+        lexical_seconds = time.perf_counter() - lexical_start
+
+        pending = [position for position, results in enumerate(all_results) if results is None]
+        model_start = time.perf_counter()
+        if pending:
+            # Embeddings of the queries, from the shared cache when the same query was seen before
+            pending_queries = [queries[position] for position in pending]
+            query_embeddings = np.vstack(
+                get_query_embedding_cache().get_many(
+                    self.model_name, get_embedder_registry().backend, pending_queries, self._get_query_embeddings
+                )
+            )
+
+            # Perform the search, deeper than k when there are lexical hits to fuse with
+            depth = k * 4 if lexical_hits else k
+            distances, indices = self.index.search(query_embeddings, depth, params=params)
+
+            for position, query_embedding, query_distances, query_indices in zip(pending, query_embeddings, distances, indices):
+                # Cosine similarity of each dense hit, ids < 0 mean fewer vectors than requested pass the filter
+                scores = {int(idx): float(dist) for dist, idx in zip(query_distances, query_indices) if idx >= 0}
+                fused = {}
+                for ranking in (list(scores), lexical_hits.get(position, [])):
+                    for rank, idx in enumerate(ranking):
+                        fused[idx] = fused.get(idx, 0.0) + 1 / (RRF_K + rank + 1)
+                results = []
+                for idx in sorted(fused, key=fused.get, reverse=True)[:k]:
+                    if idx not in scores:
+                        scores[idx] = float(np.dot(query_embedding, self.index.reconstruct(idx)))
+                    results.append((idx, scores[idx]))
+                all_results[position] = results
+        model_seconds = time.perf_counter() - model_start
+
+        with self._stats_lock:
+            self.search_stats["queries"] += len(queries)
+            self.search_stats["lexical"] += len(queries) - len(pending)
+            self.search_stats["hybrid"] += sum(1 for position in pending if lexical_hits.get(position))
+            self.search_stats["dense"] += sum(1 for position in pending if not lexical_hits.get(position))
+            self.search_stats["lexical_seconds"] += lexical_seconds
+            self.search_stats["model_seconds"] += model_seconds
+        return all_results
+
+    def payload(self, idx):
+        """
+        The compact, serialized payload of vector idx, as stored at index time or built from its record,
+        with its link on PartSelect.
+        """
+        if self.payloads is not None:
+            return absolute_links(self.payloads.raw(idx))
+        record = self.metadata[idx]
+        return absolute_links(serialize_payload(self.item_payload(self.record_item(record), record)))
+
+    def search_payloads(self, query, k=3, appliance=None, type=None, token_budget=None, min_score=0.3):
+        """
+        Payloads of the top k hits scoring above min_score, best first, one per line, within token_budget
+        estimated tokens (TROUBLESHOOT_TOKEN_BUDGET), each hit's PAYLOAD_TEXT_FIELDS shortened to its share of the budget.
+        An empty string when nothing scores above min_score.
+        """
+        token_budget = token_budget or int(os.getenv("TROUBLESHOOT_TOKEN_BUDGET", "800"))
+        hits = self._search_ids([query], k, appliance=appliance, type=type)[0]
+        payloads = [self.payload(idx) for idx, score in hits if score > min_score]
+        return assemble_payloads(payloads, token_budget, self.PAYLOAD_TEXT_FIELDS)
+
+    def search_summary(self):
+        """
+        How queries were answered: from the lexical index alone, or with the model (fused with lexical hits or dense only),
+        the share served without inference, and the average time spent per query in each.
+        """
+        with self._stats_lock:
+            stats = dict(self.search_stats)
+        with_model = stats["hybrid"] + stats["dense"]
+        return {
+            "index": index_config(self.index) if self.index is not None else None,
+            "queries": stats["queries"],
+            "lexical": stats["lexical"],
+            "hybrid": stats["hybrid"],
+            "dense": stats["dense"],
+            "share_without_inference": round(stats["lexical"] / stats["queries"], 3) if stats["queries"] else 0.0,
+            "avg_lexical_ms": round(1000 * stats["lexical_seconds"] / stats["queries"], 3) if stats["queries"] else 0.0,
+            "avg_model_ms": round(1000 * stats["model_seconds"] / with_model, 3) if with_model else 0.0,
+        }
+
+    def embedder_compatibility(self, sample_size=32, min_cosine=None):
+        """
+        Embed up to sample_size indexed texts with the current embedder and compare them with their stored vectors,
+        to check that another backend (e.g. the quantized ONNX graph) produces vectors this index can be searched with.
+        Returns the lowest and mean cosine similarity and whether the lowest reaches min_cosine (EMBEDDER_MIN_COSINE).
+        ivf_pq indexes only keep compressed vectors, compare against them with a lower min_cosine.
+        """
+        min_cosine = min_cosine if min_cosine is not None else float(os.getenv("EMBEDDER_MIN_COSINE", "0.98"))
+        ids = [vector_id for vector_id, record in enumerate(self.metadata) if record is not None]
+        # Spread over the whole index rather than the first symptoms
+        ids = ids[::max(1, len(ids) // sample_size)][:sample_size]
+        texts = [self.item_text(self.record_item(self.metadata[idx]), self.metadata[idx]) for idx in ids]
+        embeddings = normalize(np.asarray(self.model.encode(texts, show_progress_bar=False), dtype="float32"), axis=1)
+        stored = np.vstack([self.index.reconstruct(idx) for idx in ids])
+        cosines = np.sum(embeddings * stored, axis=1)
+        return {
+            "backend": get_embedder_registry().backend,
+            "sampled": len(ids),
+            "min_cosine": round(float(cosines.min()), 4),
+            "mean_cosine": round(float(cosines.mean()), 4),
+            "compatible": bool(cosines.min() >= min_cosine),
+        }
 
     def _get_embedding(self, text):
         # Generate embedding using SentenceTransformers
         return self.model.encode(text)
+
+    def _get_query_embeddings(self, queries):
+        # Generate embeddings for the queries in one batch and normalize them
+        return normalize(np.asarray(self._get_embedding(queries), dtype="float32"), axis=1)
     
-    def save_index(self, index_path="faiss_index.bin", metadata_path="metadata.pkl"):
+    def save_index(self, index_path="faiss_index.bin", metadata_path="metadata.meta"):
         """
-        Save the FAISS index and metadata to disk.
+        Save the FAISS index, metadata and lexical index to disk.
+        The metadata, with the symptoms and each vector's tool payload, is written as an offset-indexed file
+        (see MetadataFile) that load_index memory-maps,
+        the lexical index next to the FAISS index (see lexical_index_path).
         """
-        # Save the FAISS index
-        faiss.write_index(self.index, index_path)
+        # Save the FAISS index, replacing the file rather than overwriting it as running servers may have it mapped
+        faiss.write_index(self.index, f"{index_path}.tmp")
+        os.replace(f"{index_path}.tmp", index_path)
         print(f"FAISS index saved to {index_path}")
 
         # Save the metadata
-        with open(metadata_path, "wb") as f:
-            pickle.dump(self.metadata, f)
+        items = list(self.items)
+        payloads = [
+            self.item_payload(self.record_item(record, items), record) if record is not None else None
+            for record in self.metadata
+        ]
+        write_metadata(metadata_path, list(self.metadata), tags=self.TAGS, tables={self.ITEMS_TABLE: items, "payloads": payloads})
         print(f"Metadata saved to {metadata_path}")
 
-    def load_index(self, index_path="faiss_index.bin", metadata_path="metadata.pkl"):
+        # Save the lexical index, built here for indexes loaded or merged without one
+        if self.lexical is None:
+            self.lexical = self._build_lexical()
+        self.lexical.save(lexical_index_path(index_path))
+        print(f"Lexical index saved to {lexical_index_path(index_path)}")
+
+    def load_index(self, index_path="faiss_index.bin", metadata_path="metadata.meta", mmap=True):
         """
         Load the FAISS index and metadata from disk.
+        With mmap the index vectors and the metadata are memory-mapped instead of copied into this process,
+        so API workers share one copy through the OS page cache and loading does not depend on KB size.
+        Legacy pickled metadata (.pkl) is still read, fully, into memory and normalized.
         """
         # Load the FAISS index
-        self.index = faiss.read_index(index_path)
+        io_flags = getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP) if mmap else 0
+        self.index = faiss.read_index(index_path, io_flags)
+        self._mapped = mmap
         print(f"FAISS index loaded from {index_path}")
 
         # Load the metadata
-        with open(metadata_path, "rb") as f:
-            self.metadata = pickle.load(f)
-        print(f"Metadata loaded from {metadata_path}")
\ No newline at end of file
+        if metadata_path.endswith(".pkl"):
+            with open(metadata_path, "rb") as f:
+                self.metadata, self.items = normalize_metadata(pickle.load(f))
+            self.payloads = None
+        else:
+            self.metadata = MetadataFile(metadata_path)
+            self.items = self.metadata.tables[self.ITEMS_TABLE]
+            self.payloads = self.metadata.tables.get("payloads")
+        print(f"Metadata loaded from {metadata_path}")
+
+        # Load the lexical index, without one every query is embedded
+        lexical_path = lexical_index_path(index_path)
+        self.lexical = LexicalIndex.load(lexical_path) if os.path.exists(lexical_path) else None
+        if self.lexical is None:
+            print(f"No lexical index at {lexical_path}, all queries will be embedded")
+        else:
+            print(f"Lexical index loaded from {lexical_path}")
+        self._selectors = {}
@@ -0,0 +1,47 @@
+import os
+import sys
+# Make the backend packages (crawler, knowledge_base) importable when run as a script
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import time
+
+from knowledge_base.PartKnowledgeIndexer import PartKnowledgeIndexer
+from crawler.CatalogStore import CatalogStore
+
+PART_KNOWLEDGE_INDEX_PATH = "part_knowledge_faiss_index.bin"
+PART_KNOWLEDGE_METADATA_PATH = "part_knowledge_metadata.meta"
+
+def index_part_knowledge(full=False, catalog_path=None):
+    """
+    Bring the part knowledge index up to date with the repair stories and Q&A in the offline catalog
+    (crawler/CrawlCatalog.py stores them for every part it crawls): only new or changed questions and stories
+    are embedded, and ones no longer in the catalog are removed. With full, or when there is no index yet,
+    everything is embedded again.
+    """
+    store = CatalogStore(catalog_path)
+    parts = store.iter_part_feedback()
+    store.close()
+    if not any(part["stories"] or part["questions"] for part in parts):
+        print("No repair stories or Q&A in the catalog, crawl parts with crawler/CrawlCatalog.py first")
+        return None
+
+    part_knowledge = PartKnowledgeIndexer(data_list=None)
+    incremental = not full and os.path.exists(PART_KNOWLEDGE_INDEX_PATH) and os.path.exists(PART_KNOWLEDGE_METADATA_PATH)
+    if incremental:
+        # Loaded into memory, as the index is modified in place
+        part_knowledge.load_index(PART_KNOWLEDGE_INDEX_PATH, PART_KNOWLEDGE_METADATA_PATH, mmap=False)
+    start = time.perf_counter()
+    changes = part_knowledge.update(parts)
+    part_knowledge.save_index(PART_KNOWLEDGE_INDEX_PATH, PART_KNOWLEDGE_METADATA_PATH)
+    print(
+        f"Finished Indexing Part Knowledge for {len(parts)} parts ({'incremental' if incremental else 'full'}): "
+        f"{len(changes['added'])} added, {len(changes['changed'])} changed, {len(changes['removed'])} removed, "
+        f"{changes['unchanged']} unchanged in {time.perf_counter() - start:.1f}s"
+    )
+    return changes
+
+if __name__ == "__main__":
+    # The catalog path defaults to CATALOG_PATH, relative to the backend directory
+    catalog_path = os.getenv("CATALOG_PATH", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "crawler", "catalog.sqlite3"))
+    index_part_knowledge(full="--full" in sys.argv, catalog_path=catalog_path)
+    print("Indexing completed.")
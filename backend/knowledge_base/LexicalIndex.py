@@ -0,0 +1,149 @@
+import numpy as np
+import json
+import os
+import re
+
+# Splits words and CamelCase part names ("DrainPumpAnd" -> "Drain", "Pump", "And")
+TOKEN_PATTERN = re.compile(r"[A-Z]+(?![a-z])|[A-Z]?[a-z]+|\d+")
+
+# Words that say nothing about the symptom or part. Appliance names are dropped too since searches
+# are already filtered by appliance. "not" is kept, it is part of most symptom titles.
+STOPWORDS = {
+    "a", "an", "and", "or", "the", "is", "are", "was", "be", "it", "its", "my", "i", "me", "we", "you", "your",
+    "of", "to", "in", "on", "at", "for", "with", "from", "by", "this", "that", "there", "what", "how", "why",
+    "when", "do", "does", "can", "could", "should", "would", "have", "has", "any", "some", "help", "please",
+    "dishwasher", "refrigerator", "fridge", "appliance",
+}
+
+
+def tokenize(text):
+    """
+    Lowercased, lightly stemmed terms of text without stopwords.
+    """
+    tokens = []
+    for token in TOKEN_PATTERN.findall(text or ""):
+        token = token.lower()
+        if token in STOPWORDS:
+            continue
+        for suffix in ("ing", "ed", "s"):
+            if token.endswith(suffix) and len(token) - len(suffix) >= 3:
+                token = token[:-len(suffix)]
+                break
+        tokens.append(token)
+    return tokens
+
+
+def lexical_index_path(index_path):
+    """
+    Where the lexical index of a FAISS index file is saved, e.g. troubleshoot_faiss_index.lexical.json.
+    """
+    return f"{os.path.splitext(index_path)[0]}.lexical.json"
+
+
+class LexicalIndex:
+    def __init__(self, ids, lengths, names, postings, k1=1.5, b=0.75):
+        """
+        BM25 inverted index over the texts of the vectors of a FAISS index.
+        ids are the vector ids, lengths their texts' term counts, names the terms of each vector's
+        symptom title or part name, and postings maps each term to the positions (in ids) of the
+        texts containing it and its count in each.
+        """
+        self.ids = np.asarray(ids, dtype="int64")
+        self.lengths = np.asarray(lengths, dtype="float32")
+        self.names = [frozenset(name) for name in names]
+        self.postings = {
+            term: (np.asarray(positions, dtype="int64"), np.asarray(counts, dtype="float32"))
+            for term, (positions, counts) in postings.items()
+        }
+        self.k1 = k1
+        self.b = b
+        self._average_length = float(self.lengths.mean()) if len(self.lengths) else 0.0
+        self._positions = {vector_id: position for position, vector_id in enumerate(self.ids.tolist())}
+
+    @classmethod
+    def build(cls, documents, k1=1.5, b=0.75):
+        """
+        documents is a list of (vector id, text, name) tuples.
+        """
+        ids, lengths, names = [], [], []
+        postings = {}
+        for position, (vector_id, text, name) in enumerate(documents):
+            terms = tokenize(text)
+            ids.append(vector_id)
+            lengths.append(len(terms))
+            names.append(tokenize(name))
+            counts = {}
+            for term in terms:
+                counts[term] = counts.get(term, 0) + 1
+            for term, count in counts.items():
+                positions, term_counts = postings.setdefault(term, ([], []))
+                positions.append(position)
+                term_counts.append(count)
+        return cls(ids, lengths, names, postings, k1, b)
+
+    def scores(self, terms):
+        """
+        BM25 score of every text for the query terms, by position.
+        """
+        scores = np.zeros(len(self.ids), dtype="float32")
+        for term in set(terms):
+            if term not in self.postings:
+                continue
+            positions, counts = self.postings[term]
+            idf = np.log(1 + (len(self.ids) - len(positions) + 0.5) / (len(positions) + 0.5))
+            norm = self.k1 * (1 - self.b + self.b * self.lengths[positions] / self._average_length)
+            scores[positions] += idf * counts * (self.k1 + 1) / (counts + norm)
+        return scores
+
+    def search(self, query, k, allowed_ids=None):
+        """
+        Top k (vector id, BM25 score, whether the query contains the vector's whole name) among allowed_ids
+        (all vectors when None), best first. Texts sharing no term with the query are never returned.
+        """
+        terms = tokenize(query)
+        scores = self.scores(terms)
+        if allowed_ids is not None:
+            scores[~np.isin(self.ids, allowed_ids)] = 0
+        query_terms = set(terms)
+        positions = [position for position in np.argsort(-scores, kind="stable")[:k] if scores[position] > 0]
+        return [
+            (int(self.ids[position]), float(scores[position]), bool(self.names[position]) and self.names[position] <= query_terms)
+            for position in positions
+        ]
+
+    def confident_hits(self, query, k, allowed_ids=None):
+        """
+        (vector id, 1.0) pairs answering query without the embedding model, or None when it is not an exact name match.
+        The query's terms must be exactly the symptom title or part name of the top BM25 hit (e.g. "drain pump" or
+        "not draining"). Hits are the vectors with that same name, scored 1.0 as the query is their name.
+        A query a name only partly covers ("water inlet valve" against the part "WaterInlet", or "ice maker not working"
+        against "IceMaker") is left to the model, so that every score of a search is a cosine similarity or an exact match.
+        """
+        terms = frozenset(tokenize(query))
+        if not terms:
+            return None
+        candidates = self.search(query, max(k * 4, 20), allowed_ids)
+        exact = [vector_id for vector_id, _, _ in candidates if self.names[self._positions[vector_id]] == terms]
+        if not exact or exact[0] != candidates[0][0]:
+            return None
+        return [(vector_id, 1.0) for vector_id in exact[:k]]
+
+    def save(self, path):
+        data = {
+            "k1": self.k1,
+            "b": self.b,
+            "ids": self.ids.tolist(),
+            "lengths": self.lengths.astype(int).tolist(),
+            "names": [sorted(name) for name in self.names],
+            "postings": {term: [positions.tolist(), counts.astype(int).tolist()] for term, (positions, counts) in self.postings.items()},
+        }
+        # Replaced rather than overwritten, like the index files next to it
+        with open(f"{path}.tmp", "w") as f:
+            json.dump(data, f)
+        os.replace(f"{path}.tmp", path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            data = json.load(f)
+        return cls(data["ids"], data["lengths"], data["names"], data["postings"], data["k1"], data["b"])
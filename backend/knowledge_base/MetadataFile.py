@@ -0,0 +1,157 @@
+import numpy as np
+import struct
+import os
+import json
+import mmap
+import io
+
+MAGIC = b"KBMETA1\n"
+
+# Metadata fields stored as a per-vector column so filters never decode records
+TAGS = ("appliance", "type")
+
+
+def _tag_dtype(size):
+    """
+    The smallest tag column type holding codes for size values plus the code of vectors without the tag,
+    which is the type's largest value: uint8 for the appliance and type tags, wider for e.g. PS numbers.
+    """
+    for dtype in (np.uint8, np.uint16, np.uint32):
+        if size < np.iinfo(dtype).max:
+            return np.dtype(dtype)
+    raise ValueError(f"Too many distinct tag values: {size}")
+
+
+def _align(f, boundary=8):
+    f.write(b"\0" * (-f.tell() % boundary))
+
+
+def _write_table(body, records):
+    """
+    Append JSON encoded records back to back followed by their uint64[n + 1] offsets table.
+    Returns the table's header entry, positions are relative to the start of the body.
+    """
+    start = body.tell()
+    encoded = [json.dumps(record, ensure_ascii=False, separators=(",", ":")).encode("utf-8") for record in records]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.uint64)
+    np.cumsum([len(record) for record in encoded], out=offsets[1:])
+    offsets += start
+    for record in encoded:
+        body.write(record)
+    _align(body)
+    offsets_at = body.tell()
+    body.write(offsets.tobytes())
+    return {"count": len(encoded), "offsets_at": offsets_at}
+
+
+def write_metadata(path, metadata, tags=TAGS, tables=None):
+    """
+    Write metadata (one JSON-serializable dict per vector id, None for ids without a vector) as an offset-indexed file:
+
+        MAGIC | header length (uint64) | header JSON | body
+
+    The body holds the vector records, then every extra table in tables ({name: list of dicts}, e.g. the
+    symptoms vector records refer to by id), each as JSON records followed by a uint64 offsets table where
+    record i spans offsets[i]:offsets[i + 1], and one code column per tag (uint8 unless the tag has 255 values or more).
+    The header holds the section positions and every tag's value vocabulary and column type.
+    """
+    values = {tag: sorted({entry[tag] for entry in metadata if entry and entry.get(tag) is not None}) for tag in tags}
+
+    body = io.BytesIO()
+    header = {"count": len(metadata), "tables": {}, "tags": {}}
+    header["tables"][""] = _write_table(body, metadata)
+    for name, records in (tables or {}).items():
+        header["tables"][name] = _write_table(body, records)
+    for tag in tags:
+        dtype = _tag_dtype(len(values[tag]))
+        no_tag = np.iinfo(dtype).max
+        positions = {value: code for code, value in enumerate(values[tag])}
+        codes = [positions[entry[tag]] if entry and entry.get(tag) is not None else no_tag for entry in metadata]
+        _align(body, dtype.itemsize)
+        header["tags"][tag] = {"values": values[tag], "at": body.tell(), "dtype": dtype.name}
+        body.write(np.asarray(codes, dtype=dtype).tobytes())
+
+    # Pad the header so that the body, and with it every offsets table, stays 8 byte aligned
+    header = json.dumps(header).encode("utf-8")
+    header += b" " * (-(len(MAGIC) + 8 + len(header)) % 8)
+    # Written next to path and moved over it, so processes that have the old file mapped keep reading it intact
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<Q", len(header)))
+        f.write(header)
+        f.write(body.getbuffer())
+    os.replace(tmp_path, path)
+
+
+class RecordTable:
+    def __init__(self, buffer, body, table):
+        """
+        Lazily decoded records of one table of a metadata file.
+        """
+        self._buffer = buffer
+        self._body = body
+        self._count = table["count"]
+        self._offsets = np.frombuffer(buffer, dtype=np.uint64, count=self._count + 1, offset=body + table["offsets_at"])
+
+    def __len__(self):
+        return self._count
+
+    def raw(self, idx):
+        """
+        Record idx as the JSON text stored in the file, without decoding it.
+        """
+        if not -self._count <= idx < self._count:
+            raise IndexError(idx)
+        idx %= self._count
+        start = self._body + int(self._offsets[idx])
+        end = self._body + int(self._offsets[idx + 1])
+        return self._buffer[start:end].decode("utf-8")
+
+    def __getitem__(self, idx):
+        return json.loads(self.raw(idx))
+
+    def __iter__(self):
+        for idx in range(self._count):
+            yield self[idx]
+
+
+class MetadataFile(RecordTable):
+    def __init__(self, path):
+        """
+        Read-only, memory-mapped view of a file written by write_metadata, indexed by vector id.
+        Opening it only reads the header, records are decoded when indexed, and every process
+        opening the same file shares its pages through the OS cache.
+        """
+        self.path = path
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mmap[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a knowledge base metadata file")
+        (header_size,) = struct.unpack_from("<Q", self._mmap, len(MAGIC))
+        body = len(MAGIC) + 8 + header_size
+        header = json.loads(self._mmap[len(MAGIC) + 8:body])
+        super().__init__(self._mmap, body, header["tables"][""])
+        self.tables = {
+            name: RecordTable(self._mmap, body, table) for name, table in header["tables"].items() if name
+        }
+        self._tags = {
+            tag: (column["values"], np.frombuffer(self._mmap, dtype=column["dtype"], count=self._count, offset=body + column["at"]))
+            for tag, column in header["tags"].items()
+        }
+
+    def tag_ids(self, tag, value):
+        """
+        Ids of the vectors whose tag equals value (case-insensitively), read from the tag column.
+        """
+        if tag not in self._tags:
+            return np.zeros(0, dtype="int64")
+        vocabulary, codes = self._tags[tag]
+        matches = [code for code, candidate in enumerate(vocabulary) if candidate.lower() == value.lower()]
+        return np.flatnonzero(np.isin(codes, matches)).astype("int64")
+
+    def close(self):
+        self._offsets = None
+        self.tables = {}
+        self._tags = {}
+        self._mmap.close()
@@ -0,0 +1,145 @@
+import os
+import re
+
+from knowledge_base.FaissIndexer import FaissIndexer, content_hash
+from knowledge_base.RetrievalPayloads import assemble_payloads
+from crawler.PartNumbers import normalize_key
+from crawler.SiteUrls import site_path
+
+# PS numbers named in a query, used to restrict a search to that part when no part number is passed
+PS_NUMBER_PATTERN = re.compile(r"\bPS\d{5,}\b", re.IGNORECASE)
+
+
+def entry_text(part, record):
+    """
+    The text embedded for a question (with its answer) or a repair story (with its difficulty and time).
+    """
+    if record["type"] == "question":
+        question = part["questions"][record["entry"]]
+        return f"{question['question']} - {question['answer']}"
+    story = part["stories"][record["entry"]]
+    return f"{story['story']} - Difficulty: {story['difficulty_level']} - Repair time: {story['total_repair_time']}"
+
+
+class PartKnowledgeIndexer(FaissIndexer):
+    # Vectors are tagged with the PS number of their part, so a search can be restricted to one part
+    TAGS = ("part", "type")
+    ITEMS_TABLE = "parts"
+    ITEM_KEY = "part_id"
+    PAYLOAD_TEXT_FIELDS = ("answer", "story")
+
+    def __init__(self, data_list, model_name="all-MiniLM-L6-v2", index_type=None, index_params=None):
+        """
+        Index of the questions and answers and repair stories crawled from part pages.
+        data_list is a list of parts as returned by CatalogStore.iter_part_feedback: dicts with part_number,
+        part_url, stories (story, difficulty_level, total_repair_time) and questions (question, answer).
+        One vector per question and per story, tagged with the part's PS number and its type ("question", "story").
+        Building, incremental updates, saving and loading work as for the troubleshooting FaissIndexer.
+        """
+        super().__init__(data_list, model_name, index_type, index_params)
+
+    def collect_texts(self):
+        """
+        The texts to embed (one per question and one per story), their metadata records in index order
+        and the parts those records refer to.
+        """
+        texts = []
+        metadata = []
+        parts = []
+        for part in self.data_list or []:
+            part_id = len(parts)
+            parts.append(part)
+            part_number = normalize_key(part["part_number"])
+            for type, key in (("question", "questions"), ("story", "stories")):
+                for entry in range(len(part.get(key) or [])):
+                    record = {"type": type, "part": part_number, "part_id": part_id, "entry": entry}
+                    texts.append(entry_text(part, record))
+                    metadata.append(record)
+        return texts, metadata, parts
+
+    def item_text(self, item, record):
+        return entry_text(item, record)
+
+    def item_name(self, item, record):
+        # Questions and stories have no name for the lexical index to match whole, their terms still rank hits
+        return ""
+
+    def describe(self, vector_id, item, record, text):
+        entry = {"id": int(vector_id), "part": record["part"], "type": record["type"], "hash": content_hash(text)}
+        if record["type"] == "question":
+            entry["question"] = item["questions"][record["entry"]]["question"]
+        else:
+            entry["story"] = item["stories"][record["entry"]]["story"].split(" - ")[0]
+        return entry
+
+    def item_slot(self, item, record):
+        return (record["part"], record["type"], record["entry"])
+
+    def item_payload(self, item, record):
+        """
+        What the part knowledge tool hands the LLM for a vector: the part, the question and answer or the story
+        with its difficulty and repair time, and the part page.
+        """
+        payload = {"part": record["part"]}
+        if record["type"] == "question":
+            question = item["questions"][record["entry"]]
+            payload["question"] = question["question"]
+            payload["answer"] = question["answer"]
+        else:
+            story = item["stories"][record["entry"]]
+            payload["story"] = story["story"]
+            payload["difficulty"] = story["difficulty_level"]
+            payload["repair_time"] = story["total_repair_time"]
+        payload["link"] = site_path(item.get("part_url"))
+        return {key: value for key, value in payload.items() if value}
+
+    def resolve(self, record):
+        part = self.record_item(record)
+        key = "questions" if record["type"] == "question" else "stories"
+        return {
+            "type": record["type"],
+            "part": record["part"],
+            "part_url": part.get("part_url"),
+            "data": part[key][record["entry"]],
+        }
+
+    def part_filter(self, query, part_number=None):
+        """
+        The PS number to restrict a search to: part_number, else the PS number named in query, else None.
+        """
+        if not part_number:
+            match = PS_NUMBER_PATTERN.search(query or "")
+            part_number = match.group(0) if match else None
+        return normalize_key(part_number) if part_number else None
+
+    def search(self, query, k=5, part_number=None, type=None):
+        """
+        Top k questions and stories for query, only among part_number's (or those of the PS number in query)
+        when given, and of type ("question", "story") when given.
+        """
+        return self.search_many([query], k, part_number, type)[0]
+
+    def search_many(self, queries, k=5, part_number=None, type=None):
+        """
+        search() for several queries at once. Returns one result list per query.
+        """
+        results = []
+        for query in queries:
+            hits = self._search_ids([query], k, part=self.part_filter(query, part_number), type=type)[0]
+            results.append([{"score": score, "data": self.resolve(self.metadata[idx])} for idx, score in hits])
+        return results
+
+    def search_payloads(self, query, k=5, part_number=None, type=None, token_budget=None, min_score=None):
+        """
+        Payloads of the top k hits scoring above min_score, best first, one per line, within token_budget
+        estimated tokens (PART_KNOWLEDGE_TOKEN_BUDGET), long answers and stories shortened to each hit's share. min_score defaults to 0.3 for a search over every part
+        and to 0 within one part, where every hit is about the part asked for.
+        An empty string when nothing scores above min_score.
+        """
+        token_budget = token_budget or int(os.getenv("PART_KNOWLEDGE_TOKEN_BUDGET", "800"))
+        part = self.part_filter(query, part_number)
+        if min_score is None:
+            min_score = 0.0 if part else 0.3
+        hits = self._search_ids([query], k, part=part, type=type)[0]
+        payloads = [self.payload(idx) for idx, score in hits if score > min_score]
+        return assemble_payloads(payloads, token_budget, self.PAYLOAD_TEXT_FIELDS)
@@ -0,0 +1,125 @@
+from collections import OrderedDict
+import threading
+import atexit
+import numpy as np
+import pickle
+import re
+import os
+
+
+def normalize_query(query):
+    """
+    Cache key for a query: case and whitespace do not change the embedding of an uncased model.
+    """
+    return re.sub(r"\s+", " ", query).strip().lower()
+
+
+class QueryEmbeddingCache:
+    def __init__(self, max_entries=None, path=None):
+        """
+        LRU cache of query embeddings (one normalized row per query) keyed by (model name, embedder backend,
+        normalized query), shared by every index, so a repeated query skips model inference. The backend is part of
+        the key as the quantized ONNX model embeds slightly differently from the PyTorch one. path (QUERY_EMBEDDING_CACHE_PATH)
+        persists the cache between restarts; without it the cache only lives in memory.
+        """
+        self.max_entries = max_entries or int(os.getenv("QUERY_EMBEDDING_CACHE_SIZE", "10000"))
+        self.path = path or os.getenv("QUERY_EMBEDDING_CACHE_PATH")
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0}
+        if self.path and os.path.exists(self.path):
+            self.load(self.path)
+
+    def get_or_compute(self, model_name, backend, query, embed):
+        """
+        Return the cached embedding of query, or compute it with embed(query) and cache it.
+        Cached arrays are read-only and shared between callers.
+        """
+        return self.get_many(model_name, backend, [query], lambda queries: embed(queries[0]))[0]
+
+    def get_many(self, model_name, backend, queries, embed_many):
+        """
+        Embeddings of queries, one row each. Queries missing from the cache are embedded together
+        with a single embed_many(missing_queries) call returning one row per query.
+        """
+        keys = [(model_name, backend, normalize_query(query)) for query in queries]
+        embeddings = [None] * len(queries)
+        missing = {}
+        with self._lock:
+            for i, key in enumerate(keys):
+                embedding = self._entries.get(key)
+                if embedding is not None:
+                    self._entries.move_to_end(key)
+                    self.stats["hits"] += 1
+                    embeddings[i] = embedding
+                else:
+                    self.stats["misses"] += 1
+                    missing.setdefault(key, []).append(i)
+
+        if missing:
+            computed = embed_many([queries[positions[0]] for positions in missing.values()])
+            with self._lock:
+                for (key, positions), embedding in zip(missing.items(), computed):
+                    embedding = np.array(embedding).reshape(-1)
+                    embedding.flags.writeable = False
+                    self._entries[key] = embedding
+                    self._entries.move_to_end(key)
+                    for i in positions:
+                        embeddings[i] = embedding
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                    self.stats["evictions"] += 1
+        return embeddings
+
+    def hit_rate(self):
+        with self._lock:
+            lookups = self.stats["hits"] + self.stats["misses"]
+            return self.stats["hits"] / lookups if lookups else 0.0
+
+    def summary(self):
+        with self._lock:
+            entries = len(self._entries)
+        return {**self.stats, "entries": entries, "hit_rate": round(self.hit_rate(), 3)}
+
+    def save(self, path=None):
+        """
+        Write the cached embeddings, least recently used first, to path.
+        """
+        path = path or self.path
+        with self._lock:
+            entries = list(self._entries.items())
+        with open(path, "wb") as f:
+            pickle.dump(entries, f)
+        print(f"Saved {len(entries)} query embeddings to {path}")
+
+    def load(self, path):
+        try:
+            with open(path, "rb") as f:
+                entries = pickle.load(f)
+        except Exception as e:
+            print(f"Error loading query embeddings from {path}: {e}")
+            return
+        with self._lock:
+            for key, embedding in entries[-self.max_entries:]:
+                embedding = embedding.reshape(-1)
+                embedding.flags.writeable = False
+                self._entries[key] = embedding
+        print(f"Loaded {len(self._entries)} query embeddings from {path}")
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_query_embedding_cache():
+    """
+    Return the process-wide query embedding cache, creating it on first use.
+    The cache is written back to QUERY_EMBEDDING_CACHE_PATH at exit when that is set.
+    """
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = QueryEmbeddingCache()
+            if _cache.path:
+                atexit.register(_cache.save)
+        return _cache
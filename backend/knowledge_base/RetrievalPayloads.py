@@ -0,0 +1,101 @@
+import json
+import re
+
+from crawler.SiteUrls import CANONICAL_BASE_URL
+
+# Video id in the thumbnail and embed links scraped from the repair pages
+YOUTUBE_ID_PATTERN = re.compile(r"youtube(?:-nocookie)?\.com/(?:vi|embed)/([\w-]+)")
+
+# Rough characters per token of English text, used to keep the tool output under a token budget
+CHARS_PER_TOKEN = 4
+
+
+def youtube_watch_url(link):
+    """
+    The watch page of a YouTube thumbnail/embed link, other links unchanged.
+    """
+    match = YOUTUBE_ID_PATTERN.search(link or "")
+    if match:
+        return f"https://www.youtube.com/watch?v={match.group(1)}"
+    return link or None
+
+
+def build_payload(symptom, record):
+    """
+    What the troubleshooting tool hands the LLM for a vector: the symptom with its repair page and video for a title hit
+    (and the parts its solutions cover), the part and how to check it for a solution hit. Missing fields are left out.
+    """
+    payload = {"appliance": record.get("appliance"), "symptom": symptom["title"]}
+    if record["type"] == "title":
+        payload["description"] = symptom.get("description")
+        payload["parts"] = [solution["part"] for solution in symptom.get("solutions", [])] or None
+    else:
+        solution = symptom["solutions"][record["solution"]]
+        payload["part"] = solution["part"]
+        payload["description"] = solution["description"]
+    payload["video"] = youtube_watch_url(symptom.get("video_link"))
+    # The repair page path, joined with the PartSelect host when the payload is served (see absolute_links)
+    payload["link"] = symptom.get("href")
+    return {key: value for key, value in payload.items() if value}
+
+
+def serialize_payload(payload):
+    # Same encoding as the records of a metadata file, so stored payloads are returned as they are
+    return json.dumps(payload, ensure_ascii=False, separators=(",", ":"))
+
+
+def absolute_links(payload):
+    """
+    A serialized payload with its site path link turned into the PartSelect URL. Links that are already
+    absolute are left as they are.
+    """
+    return payload.replace('"link":"/', f'"link":"{CANONICAL_BASE_URL}/')
+
+
+def estimate_tokens(text):
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+
+def truncate_payload(payload, max_tokens, fields):
+    """
+    Cut a serialized payload down to max_tokens estimated tokens by shortening the text of its fields, the longest
+    first, at a word boundary with "..." appended, and dropping a field that would be left empty.
+    Returns the shortest payload it got to, which is still over max_tokens when the other fields alone exceed it.
+    """
+    if estimate_tokens(payload) <= max_tokens:
+        return payload
+    data = json.loads(payload)
+    for field in sorted((field for field in fields if data.get(field)), key=lambda field: -len(data[field])):
+        excess = (estimate_tokens(payload) - max_tokens) * CHARS_PER_TOKEN
+        keep = len(data[field]) - excess - len("...")
+        if keep > 0:
+            data[field] = data[field][:keep].rsplit(" ", 1)[0] + "..."
+        else:
+            del data[field]
+        payload = serialize_payload(data)
+        if estimate_tokens(payload) <= max_tokens:
+            break
+    return payload
+
+
+def assemble_payloads(payloads, token_budget, fields=()):
+    """
+    Join serialized payloads, best first, one per line, within token_budget estimated tokens.
+    The budget is shared out evenly, the tokens short payloads leave unused going to the longer ones, and a payload
+    over its share has the text of its fields shortened to fit (see truncate_payload) instead of crowding out the hits
+    after it. A payload that does not fit even shortened is left out, except the first.
+    """
+    # One token of each line is the newline
+    sizes = [estimate_tokens(payload) + 1 for payload in payloads]
+    shares = {}
+    left = token_budget
+    for count, position in enumerate(sorted(range(len(payloads)), key=sizes.__getitem__)):
+        shares[position] = min(sizes[position], left // (len(payloads) - count))
+        left -= shares[position]
+    lines = []
+    for position, payload in enumerate(payloads):
+        line = truncate_payload(payload, shares[position] - 1, fields)
+        if lines and estimate_tokens(line) > shares[position] - 1:
+            continue
+        lines.append(line)
+    return "\n".join(lines)
@@ -1,24 +1,117 @@
-from TroubleshootInformation import TroubleshootInformation
-
-from FaissIndexer import FaissIndexer
-
-def scrape_and_index_troubleshoot():    
-    repair_url = "https://www.partselect.com/Repair/"
-    dishwasher_url = f"{repair_url}Dishwasher"
-    refrigerator_url = f"{repair_url}Refrigerator"
-    dishwasherTroubleshoot = TroubleshootInformation(dishwasher_url)
-    print("Scraped Dishwasher Troubleshooting Data")
-    faiss_dishwasher = FaissIndexer(dishwasherTroubleshoot.symptom_data)
-    faiss_dishwasher.create_index()
-    faiss_dishwasher.save_index("dishwasher_faiss_index.bin", "dishwasher_metadata.pkl")
-    print("Finished Indexing Dishwasher Troubleshooting Data")
-    refrigeratorTroubleshoot = TroubleshootInformation(refrigerator_url)
-    faiss_refrigerator = FaissIndexer(refrigeratorTroubleshoot.symptom_data)
-    faiss_refrigerator.create_index()
-    faiss_refrigerator.save_index("refrigerator_faiss_index.bin", "refrigerator_metadata.pkl")
-    print("Finished Indexing Dishwasher and Refrigerator Troubleshooting Data")
-    print("Saved FAISS index and metadata for Dishwasher and Refrigerator")
+import os
+import sys
+# Make the backend packages (crawler, knowledge_base) importable when run as a script
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+import json
+import time
+
+from knowledge_base.TroubleshootInformation import TroubleshootInformation
+
+from knowledge_base.FaissIndexer import FaissIndexer
+from crawler.SiteUrls import PARTSELECT_BASE_URL
+from crawler.PageReadiness import readiness_stats
+
+TROUBLESHOOT_INDEX_PATH = "troubleshoot_faiss_index.bin"
+TROUBLESHOOT_METADATA_PATH = "troubleshoot_metadata.meta"
+TROUBLESHOOT_MANIFEST_PATH = "troubleshoot_manifest.json"
+
+# Appliances with a PartSelect Repair page, indexed together into one tagged index
+APPLIANCES = ["Dishwasher", "Refrigerator"]
+
+def scrape_troubleshoot(parallel=None):
+    """
+    Scrape the repair pages of every appliance in APPLIANCES, returning {appliance: symptom data} and the pages
+    that could not be loaded ({url: error}). With parallel (TROUBLESHOOT_PARALLEL by default) the appliances are
+    scraped at the same time and so are their symptom pages, otherwise one page after another in one driver.
+    """
+    repair_url = f"{PARTSELECT_BASE_URL}/Repair/"
+    if parallel is None:
+        parallel = os.getenv("TROUBLESHOOT_PARALLEL", "true").lower() == "true"
+
+    def scrape(appliance):
+        information = TroubleshootInformation(f"{repair_url}{appliance}", parallel=parallel)
+        if information.symptom_data is None:
+            information.errors.setdefault(information.url, "Error loading the page.")
+        print(f"Scraped {appliance} Troubleshooting Data in {information.elapsed:.1f}s")
+        return information
+
+    if parallel:
+        with ThreadPoolExecutor(max_workers=len(APPLIANCES)) as executor:
+            scraped = list(executor.map(scrape, APPLIANCES))
+    else:
+        scraped = [scrape(appliance) for appliance in APPLIANCES]
+    troubleshoot_data = {appliance: information.symptom_data for appliance, information in zip(APPLIANCES, scraped)}
+    errors = {url: error for information in scraped for url, error in information.errors.items()}
+    return troubleshoot_data, errors
+
+def scrape_and_index_troubleshoot(full=False, parallel=None):
+    """
+    Scrape the repair pages and bring the index up to date: only symptoms and solutions whose text is new or
+    changed since the last run are embedded, and ones no longer listed are removed. With full, or when there
+    is no index yet, everything is embedded again. What changed is written to TROUBLESHOOT_MANIFEST_PATH.
+    If any page could not be scraped the index is left as it is, rather than losing the symptoms on that page.
+    """
+    start = time.perf_counter()
+    troubleshoot_data, errors = scrape_troubleshoot(parallel)
+    scrape_seconds = time.perf_counter() - start
+    print(f"Scraped {' and '.join(APPLIANCES)} Troubleshooting Data in {scrape_seconds:.1f}s")
+    if errors:
+        for url, error in errors.items():
+            print(f"Error scraping {url}: {error}")
+        raise RuntimeError(f"{len(errors)} troubleshooting pages could not be scraped, the index was not updated")
+
+    faiss_troubleshoot = FaissIndexer(data_list=None)
+    incremental = not full and os.path.exists(TROUBLESHOOT_INDEX_PATH) and os.path.exists(TROUBLESHOOT_METADATA_PATH)
+    if incremental:
+        # Loaded into memory, as the index is modified in place
+        faiss_troubleshoot.load_index(TROUBLESHOOT_INDEX_PATH, TROUBLESHOOT_METADATA_PATH, mmap=False)
+    index_start = time.perf_counter()
+    changes = faiss_troubleshoot.update(troubleshoot_data)
+    index_seconds = time.perf_counter() - index_start
+    faiss_troubleshoot.save_index(TROUBLESHOOT_INDEX_PATH, TROUBLESHOOT_METADATA_PATH)
+
+    manifest = {
+        "updated_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "mode": "incremental" if incremental else "full",
+        "model_name": faiss_troubleshoot.model_name,
+        "vectors": faiss_troubleshoot.index.ntotal,
+        "embedded": len(changes["added"]) + len(changes["changed"]),
+        "unchanged": changes["unchanged"],
+        "scrape_seconds": round(scrape_seconds, 2),
+        "index_seconds": round(index_seconds, 2),
+        **{key: changes[key] for key in ("added", "changed", "removed")},
+    }
+    with open(TROUBLESHOOT_MANIFEST_PATH, "w") as f:
+        json.dump(manifest, f, indent=2)
+    print(
+        f"Finished Indexing {' and '.join(APPLIANCES)} Troubleshooting Data ({manifest['mode']}): "
+        f"{len(changes['added'])} added, {len(changes['changed'])} changed, {len(changes['removed'])} removed, "
+        f"{changes['unchanged']} unchanged in {index_seconds:.1f}s, manifest written to {TROUBLESHOOT_MANIFEST_PATH}"
+    )
+    print(f"Page readiness: {readiness_stats.summary()}")
+    return manifest
+
+def merge_appliance_indexes(index_paths):
+    """
+    Build the combined index from per-appliance index/metadata pairs written by earlier versions,
+    e.g. {"Dishwasher": ("dishwasher_faiss_index.bin", "dishwasher_metadata.pkl")}, without scraping or embedding.
+    """
+    indexers = {}
+    for appliance, (index_path, metadata_path) in index_paths.items():
+        indexers[appliance] = FaissIndexer(data_list=None)
+        indexers[appliance].load_index(index_path, metadata_path)
+    FaissIndexer.merge(indexers).save_index(TROUBLESHOOT_INDEX_PATH, TROUBLESHOOT_METADATA_PATH)
 
 if __name__ == "__main__":
-    scrape_and_index_troubleshoot()
-    print("Scraping and Indexing completed.")
\ No newline at end of file
+    if "--merge-existing" in sys.argv:
+        merge_appliance_indexes({
+            appliance: (f"{appliance.lower()}_faiss_index.bin", f"{appliance.lower()}_metadata.pkl")
+            for appliance in APPLIANCES
+        })
+        print("Merged the per-appliance indexes.")
+    else:
+        scrape_and_index_troubleshoot(full="--full" in sys.argv, parallel=False if "--serial" in sys.argv else None)
+        print("Scraping and Indexing completed.")
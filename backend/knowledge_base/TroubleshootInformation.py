@@ -1,27 +1,40 @@
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
-from webdriver_manager.chrome import ChromeDriverManager
-from bs4 import BeautifulSoup
+from selenium.common.exceptions import WebDriverException
 import time
+import os
+
+from crawler.DriverPool import get_driver_pool
+from crawler.PageReadiness import load_page
+from crawler.HtmlParser import parse_page
+from crawler.Fetcher import get_fetcher
+
+# Pause before the first retry of failed pages, doubled for every further retry
+RETRY_BACKOFF_SECONDS = 1.0
 
 class TroubleshootInformation:
-    def __init__(self, url):
-        chrome_options = Options()
-        chrome_options.add_argument("--headless=new")  # Enable headless mode
-        chrome_options.add_argument("--disable-gpu")
-        chrome_options.add_argument("--no-sandbox")
-        chrome_options.add_argument("--disable-dev-shm-usage")
-        chrome_options.add_argument("--disable-blink-features=AutomationControlled")
-        chrome_options.add_argument("user-agent=Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/89.0.4389.82 Safari/537.36")
-        chrome_options.add_argument("window-size=1920,1080")
-        chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
-        chrome_options.add_experimental_option("useAutomationExtension", False)
-        self.service = Service(ChromeDriverManager().install())
-        self.driver = webdriver.Chrome(service=self.service, options=chrome_options)
+    def __init__(self, url, parallel=None, retries=None):
+        """
+        Scrape the symptoms listed on an appliance Repair page (url) and the video and solutions of each.
+        parallel fetches the symptom pages at the same time through the shared page fetcher (over HTTP, or on pooled
+        Chrome drivers when a page needs rendering), bounded by FETCH_WORKERS and DRIVER_POOL_SIZE, instead of one
+        after another in a single driver. Pages that fail are fetched again up to retries times, and the ones
+        that never load are left out of symptom_data and listed in errors (URL -> error).
+        Defaults come from TROUBLESHOOT_PARALLEL and TROUBLESHOOT_RETRIES.
+        """
         self.url = url
-        self.symptom_data = self.get_symptom_list()
-        self.driver.quit()
+        self.parallel = parallel if parallel is not None else os.getenv("TROUBLESHOOT_PARALLEL", "true").lower() == "true"
+        self.retries = retries if retries is not None else int(os.getenv("TROUBLESHOOT_RETRIES", "2"))
+        self.errors = {}
+        start = time.perf_counter()
+        if self.parallel:
+            self.symptom_data = self.get_symptom_list_parallel()
+        else:
+            with get_driver_pool().lease() as driver:
+                self.driver = driver
+                self.symptom_data = self.get_symptom_list()
+        self.elapsed = time.perf_counter() - start
+
+    def symptom_url(self, symptom):
+        return self.url + "/" + symptom["href"].strip().split("/")[-2]
 
 
     def get_symptom_list(self):
@@ -36,77 +49,132 @@ class TroubleshootInformation:
             }]
         }
         """
-        # Set up the WebDriver
-        driver = self.driver
         all_symptoms = []
+        soup = self.load_page_with_retries(self.url, "repair")
+        if soup is None:
+            print("Error loading the page.")
+            return None
 
-        try:
-            driver.get(self.url)
-            time.sleep(2)  # Wait for JavaScript to load content
-
-            # Get page source after JavaScript execution
-            html = driver.page_source
-            soup = BeautifulSoup(html, "html.parser")
+        for symptom in self.parse_symptom_list(soup):
+            symptom_soup = self.load_page_with_retries(self.symptom_url(symptom), "symptom")
+            if symptom_soup is None:
+                continue
+            symptom["video_link"], symptom["solutions"] = self.parse_symptom_page(symptom_soup)
+            all_symptoms.append(symptom)
+        return all_symptoms
 
-            main_symptom_container = soup.find("div", class_="symptom-list")
-            # print(main_symptom_container)
-            if main_symptom_container:
-                symptom_links = main_symptom_container.find_all("a", class_="row")
-                # print(symptom_links)
-                for link in symptom_links:
-                    title = link.find("h3", class_="title-md mb-3").text.strip()
-                    description = link.find("p").text.strip()
-                    href = link.get('href')
-                    symptom = {
-                        "title": title,
-                        "description": description,
-                        "href": href,
-                    }
-                    symptom_url = self.url + "/" + href.strip().split("/")[-2]
-                    video_link, resolutions = self.parse_symptom(symptom_url)
-                    symptom["video_link"] = video_link
-                    symptom["solutions"] = resolutions
-                    all_symptoms.append(symptom)
+    def load_page_with_retries(self, url, page_type):
+        """
+        Load url in the leased driver and parse it, trying again up to self.retries times with a growing pause.
+        Returns the parsed page, or None after adding url to self.errors when every attempt failed.
+        """
+        error = None
+        for attempt in range(self.retries + 1):
+            if attempt:
+                time.sleep(RETRY_BACKOFF_SECONDS * 2 ** (attempt - 1))
+                print(f"Retrying {url} (attempt {attempt + 1})")
+            try:
+                load_page(self.driver, url, page_type)
+                return parse_page(self.driver.page_source, page_type)
+            except WebDriverException as e:
+                error = e
+        self.errors[url] = str(error)
+        return None
 
-            return all_symptoms
+    def fetch_pages(self, requests):
+        """
+        Fetch requests (name -> (url, page_type)) concurrently and fetch the ones that failed again, up to
+        self.retries times with a growing pause. Returns the fetched pages by name, pages that failed every
+        attempt are added to self.errors.
+        """
+        fetcher = get_fetcher()
+        pages = {}
+        pending = dict(requests)
+        errors = {}
+        for attempt in range(self.retries + 1):
+            if attempt:
+                time.sleep(RETRY_BACKOFF_SECONDS * 2 ** (attempt - 1))
+                print(f"Retrying {len(pending)} pages of {self.url} (attempt {attempt + 1})")
+            fetched = fetcher.fetch_many(pending)
+            pages.update(fetched.results)
+            errors = fetched.errors
+            pending = {name: pending[name] for name in errors}
+            if not pending:
+                break
+        self.errors.update({url: str(errors[name]) for name, (url, _) in pending.items()})
+        return pages
 
-        except:
+    def get_symptom_list_parallel(self):
+        """
+        get_symptom_list with the symptom pages fetched concurrently. Symptoms keep the order of the Repair page.
+        """
+        pages = self.fetch_pages({"repair": (self.url, "repair")})
+        if "repair" not in pages:
             print("Error loading the page.")
+            return None
 
-    def parse_symptom(self, symptom_url):
-        driver = self.driver
-        try:
-            driver.get(symptom_url)
-            time.sleep(2)  # Wait for JavaScript to load content
-            html = driver.page_source
-            soup = BeautifulSoup(html, "html.parser")
+        symptoms = self.parse_symptom_list(pages["repair"].soup)
+        pages = self.fetch_pages({position: (self.symptom_url(symptom), "symptom") for position, symptom in enumerate(symptoms)})
+        all_symptoms = []
+        for position, symptom in enumerate(symptoms):
+            if position not in pages:
+                continue
+            symptom["video_link"], symptom["solutions"] = self.parse_symptom_page(pages[position].soup)
+            all_symptoms.append(symptom)
+        return all_symptoms
 
-            youtube_video = soup.find("img", class_="yt-video__thumb b-lazy b-loaded loaded")
-            if youtube_video:
-                video_link = youtube_video.get('src')
-            
-            symptom_details = []
-            symptom_resolutions = soup.find("div", class_="symptom-list")
+    @staticmethod
+    def parse_symptom_list(soup):
+        """
+        Extract the symptoms (title, description, href) listed on a parsed appliance Repair page.
+        """
+        symptoms = []
+        main_symptom_container = soup.find("div", class_="symptom-list")
+        if main_symptom_container:
+            symptom_links = main_symptom_container.find_all("a", class_="row")
+            for link in symptom_links:
+                title = link.find("h3", class_="title-md mb-3").text.strip()
+                description = link.find("p").text.strip()
+                href = link.get('href')
+                symptoms.append({
+                    "title": title,
+                    "description": description,
+                    "href": href,
+                })
+        return symptoms
+
+    @staticmethod
+    def parse_symptom_page(soup):
+        """
+        Extract the video link and the per-part resolutions from a parsed symptom page.
+        """
+        video_link = None
+        # Server-rendered pages carry the lazy-loaded thumbnail in data-src, rendered ones in src
+        youtube_video = soup.select_one("img.yt-video__thumb")
+        if youtube_video:
+            sources = [youtube_video.get("data-src"), youtube_video.get("src")]
+            video_link = next((source for source in sources if source and not source.startswith("data:")), None)
+        
+        symptom_details = []
+        symptom_resolutions = soup.find("div", class_="symptom-list")
+        
+        if symptom_resolutions:
+            section_titles = symptom_resolutions.find_all("h2", class_="section-title")
             
-            if symptom_resolutions:
-                section_titles = symptom_resolutions.find_all("h2", class_="section-title")
+            for section_title in section_titles:
+                title = section_title.text.strip()
+                section_id = section_title.get('id', '')
+                
+                description_div = section_title.find_next("div", class_="symptom-list__desc row mb-4")
                 
-                for section_title in section_titles:
-                    title = section_title.text.strip()
-                    section_id = section_title.get('id', '')
-                    
-                    description_div = section_title.find_next("div", class_="symptom-list__desc row mb-4")
-                    
-                    if description_div:
-                        content_div = description_div.find("div", class_="col-lg-6")
-                        if content_div:
-                            full_content = ' '.join(text.strip() for text in content_div.stripped_strings)
-                            
-                            # Store the details
-                            symptom_details.append({
-                                "part": section_id,
-                                "description": full_content
-                            })
-            return video_link, symptom_details
-        except:
-            print("Error loading the symptom page.")
+                if description_div:
+                    content_div = description_div.find("div", class_="col-lg-6")
+                    if content_div:
+                        full_content = ' '.join(text.strip() for text in content_div.stripped_strings)
+                        
+                        # Store the details
+                        symptom_details.append({
+                            "part": section_id,
+                            "description": full_content
+                        })
+        return video_link, symptom_details
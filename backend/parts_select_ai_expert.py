@@ -15,8 +15,17 @@ from typing import List
 from crawler.PartInformation import PartInformation
 from crawler.ModelInformation import ModelInformation
 from crawler import ModelCompatibility
+from crawler.SiteUrls import PARTSELECT_BASE_URL
+from crawler.CrawlCache import get_crawl_cache
+from crawler.PartNumbers import normalize_key
+from crawler.SingleFlight import SingleFlight
+from crawler.CrawlExecutor import get_crawl_executor
+from crawler.CatalogStore import get_catalog_store
+from crawler.CompatibilityIndex import get_compatibility_index
 from knowledge_base.FaissIndexer import FaissIndexer
-import json
+from knowledge_base.PartKnowledgeIndexer import PartKnowledgeIndexer
+from knowledge_base.EmbedderRegistry import get_embedder_registry
+from knowledge_base.QueryEmbeddingCache import get_query_embedding_cache
 
 load_dotenv()
 
@@ -26,12 +35,71 @@ model = OpenAIModel(llm)
 logfire.configure(send_to_logfire='if-token-present')
 
 ## Load Knowledge Base
-faiss_dishwasher = FaissIndexer(data_list=None)
-faiss_refrigerator = FaissIndexer(data_list=None)
+# One index holds every appliance, searches are filtered by the appliance tag
+faiss_troubleshoot = FaissIndexer(data_list=None)
 
 # Load the FAISS index and metadata
-faiss_dishwasher.load_index("./knowledge_base/dishwasher_faiss_index.bin", "./knowledge_base/dishwasher_metadata.pkl")
-faiss_refrigerator.load_index("./knowledge_base/refrigerator_faiss_index.bin", "./knowledge_base/refrigerator_metadata.pkl")
+faiss_troubleshoot.load_index("./knowledge_base/troubleshoot_faiss_index.bin", "./knowledge_base/troubleshoot_metadata.meta")
+
+## Repair stories and Q&A of the parts in the offline catalog, built by knowledge_base/IndexPartKnowledge.py
+part_knowledge = None
+if os.path.exists("./knowledge_base/part_knowledge_faiss_index.bin"):
+    part_knowledge = PartKnowledgeIndexer(data_list=None)
+    part_knowledge.load_index("./knowledge_base/part_knowledge_faiss_index.bin", "./knowledge_base/part_knowledge_metadata.meta")
+
+## Indexes share one copy of the embedding model, loaded on the first search unless warmed up at startup
+embedder_registry = get_embedder_registry()
+
+## A backend other than the one the index was built with must reproduce its vectors, otherwise use torch
+if embedder_registry.backend != "torch":
+    try:
+        compatibility = faiss_troubleshoot.embedder_compatibility()
+        print(f"Embedder compatibility: {compatibility}")
+        if not compatibility["compatible"]:
+            print(f"Error: {embedder_registry.backend} embeddings do not match the index, using torch")
+            embedder_registry.use_backend("torch")
+    except Exception as e:
+        print(f"Error loading the {embedder_registry.backend} embedder, using torch: {e}")
+        embedder_registry.use_backend("torch")
+
+if os.getenv("EMBEDDER_WARMUP", "false").lower() == "true":
+    embedder_registry.warm_up()
+
+## Repeated troubleshooting queries reuse their embedding instead of running the model again
+query_embedding_cache = get_query_embedding_cache()
+
+## Crawled parts, models and compatibility checks are cached on disk with per-type TTLs
+crawl_cache = get_crawl_cache()
+
+## Concurrent tool calls for the same part/model share one in-flight crawl
+crawl_flight = SingleFlight()
+
+## Blocking Selenium/HTTP crawls run on a bounded thread pool instead of the event loop
+crawl_executor = get_crawl_executor()
+
+## Parts and models crawled offline by crawler/CrawlCatalog.py
+catalog_store = get_catalog_store()
+
+## Model -> part compatibility precomputed from crawled model Parts listings, reloaded when the index file changes
+compatibility_index = get_compatibility_index()
+
+async def cached_crawl(kind, numbers, crawl):
+    """
+    Answer from the offline catalog when it has the part/model numbers crawled within CATALOG_MAX_AGE, else from the crawl cache,
+    running the blocking crawl() on the crawl executor on a miss.
+    Concurrent calls for the same kind and numbers share one lookup.
+    The catalog and crawl cache are SQLite files, read on worker threads to keep the event loop free.
+    """
+    catalog_result = await asyncio.to_thread(catalog_store.get, kind, *numbers)
+    if catalog_result is not None:
+        return catalog_result
+
+    key = normalize_key(*numbers)
+
+    async def lookup():
+        return await crawl_cache.aget_or_fetch(kind, key, lambda: crawl_executor.run(kind, crawl))
+
+    return await crawl_flight.do((kind, key), lookup)
 
 @dataclass
 class PartsSelectAIDeps:
@@ -55,6 +123,7 @@ IMPORTANT TOOL USAGE INSTRUCTIONS:
 - If the user is asking about a general trouble shooting question without specifying the model or part number, use the retrieve_relevant_troubleshooting_documentation tool to get the relevant information. 
 - You will only pass to the retrieve_relevant_troubleshooting_documentation tool the appliance names - "Dishwasher" or "Refrigerator". Try to clean the user's query to get the more concise description of the issue.
 - If the user is already asking about a specific model, you will call the get_model_information tool to get the relevant information and answer the question.
+- For questions about how hard a part is to install, how long it takes, or what other customers asked or experienced with it, call the search_part_questions_and_stories tool first with the part number. Leave the part number empty to search every part's questions and stories.
 - Always suggest to the user if complications exist to call customer support at 1-888-944-1394 for further assistance.
 - NEVER ASK USER TO CALL ANYONE ELSE OTHER THAN CUSTOMER SUPPORT. DO NOT fabricate information or provide guesses.
 - NEVER MODIFY THE LINKS YOU GET FROM THE TOOLS. DO NOT ADD ANYTHING TO THEM. DO NOT CHANGE THE URLS.
@@ -94,37 +163,15 @@ async def retrieve_relevant_troubleshooting_documentation(ctx: RunContext[PartsS
         user_query: The user's troubleshooting related question or query 
         
     Returns:
-        A formatted string containing the top 5 most relevant troubleshooting documentation chunks
+        The most relevant troubleshooting hits, one JSON object per line (symptom or part, description,
+        video and repair page links), within the TROUBLESHOOT_TOKEN_BUDGET token budget
     """
     try:
-    
-        print(user_query,"MOSHI", appliance, "HIII")
-        # Query Supabase for relevant documents
-        results = None
-        if appliance.lower() == "dishwasher":
-            results = faiss_dishwasher.search(user_query, k=3)
-        elif appliance.lower() == "refrigerator":
-            results = faiss_refrigerator.search(user_query, k=3)
-        if not results:
+        # Compact payloads precomputed at index time, as many as fit the token budget
+        payloads = faiss_troubleshoot.search_payloads(user_query, k=3, appliance=appliance)
+        if not payloads:
             return "No relevant documentation found."
-        
-        # Format the results
-        chunks = []
-        for result in results:
- 
-            if result['score'] > 0.3:  # Adjust threshold as needed
-                original_video_link = result['data']['data'].get('video_link', '')
-                # Replace the video link with the YouTube link if it exists
-                if "youtube.com" in original_video_link:
-                    # Extract the video ID from the original link
-                    video_id = original_video_link.split('/')[-2]
-                    print("Video ID:", video_id)
-                    new_video_link = f"https://www.youtube.com/watch?v={video_id}"
-                    result['data']['data']['video_link'] = new_video_link
-                chunks.append(result["data"])
-            
-        # Join all chunks with a separator
-        return "\n\n---\n\n".join(json.dumps(chunks))
+        return payloads
         
     except Exception as e:
         print(f"Error retrieving documentation: {e}")
@@ -208,17 +255,47 @@ async def get_part_installation_information(ctx: RunContext[PartsSelectAIDeps],
     """
     try:
         print("Fetching part information...")
-        url = f"https://www.partselect.com/api/search/?searchterm={part_number}&SearchMethod=standard"
+        url = f"{PARTSELECT_BASE_URL}/api/search/?searchterm={part_number}&SearchMethod=standard"
         
-        # Create the PartInformation instance
-        part_info = PartInformation(url).getPartInfoModel()
+        # Create the PartInformation instance unless the part is already cached
+        part_info = await cached_crawl(
+            "part",
+            (part_number,),
+            lambda: PartInformation(url).getPartInfoModel()
+        )
 
         return part_info.model_dump_json(indent=2)  # Convert to JSON string
                 
     except Exception as e:
         print(f"Error retrieving page content: {e}")
         return f"Error retrieving page content: {str(e)}"
-    
+
+@parts_select_expert.tool
+async def search_part_questions_and_stories(ctx: RunContext[PartsSelectAIDeps], user_query: str, part_number: str = "") -> str:
+    """
+    Search the customer questions and answers and repair stories crawled from part pages.
+
+    Args:
+        ctx: The context including the Supabase client and OpenAI client
+        user_query: The user's question, e.g. "how hard is it to install this part"
+        part_number: The PS number of the part to search, e.g. "PS11752778", or empty to search every part
+
+    Returns:
+        The most relevant questions with their answers and repair stories with their difficulty and repair time,
+        one JSON object per line, within the PART_KNOWLEDGE_TOKEN_BUDGET token budget
+    """
+    try:
+        if part_knowledge is None:
+            return "No part questions or repair stories are indexed, use get_part_installation_information instead."
+        payloads = part_knowledge.search_payloads(user_query, k=5, part_number=part_number or None)
+        if not payloads:
+            return "No matching questions or repair stories found, use get_part_installation_information instead."
+        return payloads
+
+    except Exception as e:
+        print(f"Error searching part questions and stories: {e}")
+        return f"Error searching part questions and stories: {str(e)}"
+
 @parts_select_expert.tool
 async def get_model_information(ctx: RunContext[PartsSelectAIDeps], model_number: str) -> str:
     """
@@ -234,13 +311,14 @@ async def get_model_information(ctx: RunContext[PartsSelectAIDeps], model_number
     try:
         print(f"Fetching information for model: {model_number}...")
         # Construct the model URL
-        model_url = f"https://www.partselect.com/Models/{model_number}/"
+        model_url = f"{PARTSELECT_BASE_URL}/Models/{model_number}/"
         
-        # Create the ModelInformation instance
-        model_info_instance = ModelInformation(model_url)
-        
-        # Fetch the model information
-        model_info_model = model_info_instance.getmodelInfoModel()
+        # Fetch the model information unless the model is already cached
+        model_info_model = await cached_crawl(
+            "model",
+            (model_number,),
+            lambda: ModelInformation(model_url).getmodelInfoModel()
+        )
         
         # Return the model information as a JSON string
         return model_info_model.model_dump_json(indent=2)
@@ -262,7 +340,16 @@ async def get_model_compatibility_information(ctx: RunContext[PartsSelectAIDeps]
     """
     try:
         print("Checking part compatibility with model...")
-        modelCompatibility = ModelCompatibility.checkModalCompatibility(model_number, part_number)
+        # Answer from the precomputed index, crawling only on an index miss or an expired listing
+        modelCompatibility = get_compatibility_index().get_compatibility(model_number, part_number)
+        if modelCompatibility is not None:
+            return modelCompatibility.model_dump_json(indent=2)
+
+        modelCompatibility = await cached_crawl(
+            "compatibility",
+            (model_number, part_number),
+            lambda: ModelCompatibility.checkModalCompatibility(model_number, part_number)
+        )
         print(modelCompatibility)
         return modelCompatibility.model_dump_json(indent=2)  # Convert to JSON string
                 